@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+"""Compares Place(**record) with Place.from_dict(record) on the kind of
+records FileStorage.reload() deserializes.
+
+Usage: python3 -m benchmarks.from_dict [count]
+"""
+import sys
+from time import perf_counter
+from models.place import Place
+
+
+def build_records(count):
+    """Returns count Place records as written to file.json"""
+    places = (Place(name="Place {}".format(i), city_id="c", user_id="u",
+                    number_rooms=i % 5, price_by_night=100 + i % 50,
+                    latitude=37.77, longitude=-122.41)
+              for i in range(count))
+    return [place.to_dict(save_to_disk=True) for place in places]
+
+
+def timed(build, records):
+    """Returns the seconds build takes over records and the objects"""
+    start = perf_counter()
+    objs = [build(record) for record in records]
+    return perf_counter() - start, objs
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = build_records(count)
+    kwargs_time, kwargs_objs = timed(lambda r: Place(**r), records)
+    fast_time, fast_objs = timed(Place.from_dict, records)
+    for objs in (kwargs_objs, fast_objs):
+        assert [o.to_dict(save_to_disk=True) for o in objs] == records
+    print("records:            {}".format(count))
+    print("Place(**record):    {:.3f}s ({:.2f} us/record)".format(
+        kwargs_time, kwargs_time / count * 1e6))
+    print("Place.from_dict():  {:.3f}s ({:.2f} us/record)".format(
+        fast_time, fast_time / count * 1e6))
+    print("speedup:            {:.1f}x".format(kwargs_time / fast_time))
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""Reports the bytes per object FileStorage.reload() keeps alive, and the
+peak it reaches while loading, with and without the compact in-memory
+representation (HBNB_FILE_COMPACT=1). To compare against an older tree,
+run the same store through that tree's reload().
+
+Usage: python3 -m benchmarks.memory [count]
+"""
+import gc
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+import models
+from models.engine.file_storage import FileStorage
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+
+
+def write_file(path, count):
+    """Writes a file.json of count records, mostly Places and Reviews"""
+    states = [State(name="State {}".format(i)) for i in range(50)]
+    cities = [City(name="City {}".format(i), state_id=states[i % 50].id)
+              for i in range(500)]
+    objs = states + cities
+    for i in range(len(objs), count):
+        if i % 2:
+            objs.append(Place(name="Place {}".format(i), user_id="u",
+                              city_id=cities[i % 500].id, max_guest=4,
+                              price_by_night=120, latitude=37.77,
+                              longitude=-122.41))
+        else:
+            objs.append(Review(text="Great stay", user_id="u",
+                               place_id=objs[i - 1].id))
+    with open(path, "w") as f:
+        json.dump({"{}.{}".format(type(obj).__name__, obj.id):
+                   obj.to_dict(save_to_disk=True) for obj in objs}, f)
+
+
+def measure(compact):
+    """Returns the bytes per object held after a reload and at its peak"""
+    FileStorage._FileStorage__compact = compact
+    FileStorage._FileStorage__objects = {}
+    models.storage.count()  # drops the indexes of the previous run
+    gc.collect()
+    tracemalloc.start()
+    models.storage.reload()
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = models.storage.count()
+    FileStorage._FileStorage__objects = {}
+    return size / count, peak / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        write_file(path, count)
+        FileStorage._FileStorage__file_path = path
+        before = measure(False)
+        after = measure(True)
+    print("objects:      {}".format(count))
+    print("default:      {:.0f} bytes/object, peak {:.0f}".format(*before))
+    print("compact:      {:.0f} bytes/object, peak {:.0f}".format(*after))
+    print("saved:        {:.0%}".format(1 - after[0] / before[0]))
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+"""Reports the wall-clock time and the peak memory of FileStorage.save()
+rewriting the whole file for a store of count Places.
+
+Usage: python3 -m benchmarks.save [count]
+"""
+import os
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+import models
+from models.engine.file_storage import FileStorage
+from models.place import Place
+
+
+def rss(field):
+    """Returns a memory figure of this process from /proc, in bytes"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+
+
+def reset_peak():
+    """Resets the peak RSS (VmHWM) of this process to its current RSS"""
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def timed_save():
+    """Returns the seconds and the peak RSS growth of one save()"""
+    reset_peak()
+    before = rss("VmRSS")
+    start = perf_counter()
+    models.storage.save()
+    return perf_counter() - start, rss("VmHWM") - before
+
+
+def traced_save():
+    """Returns the peak Python allocations of one save(), in bytes"""
+    tracemalloc.start()
+    models.storage.save()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        FileStorage._FileStorage__file_path = os.path.join(tmp, "file.json")
+        FileStorage._FileStorage__objects = {}
+        for i in range(count):
+            models.storage.new(Place(name="Place {}".format(i), city_id="c",
+                                     user_id="u", max_guest=4,
+                                     price_by_night=120))
+        print("objects:            {}".format(count))
+        print("store RSS:          {:.0f} MiB".format(rss("VmRSS") / 2**20))
+        seconds, peak = timed_save()
+        print("first save:         {:.2f}s, peak RSS +{:.0f} MiB".format(
+            seconds, peak / 2**20))
+        obj = next(iter(models.storage.all().values()))
+        obj.name = "renamed"
+        seconds, peak = timed_save()
+        print("one-object save:    {:.2f}s, peak RSS +{:.0f} MiB".format(
+            seconds, peak / 2**20))
+        obj.name = "renamed again"
+        print("one-object save:    peak allocations {:.0f} MiB".format(
+            traced_save() / 2**20))
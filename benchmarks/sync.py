@@ -0,0 +1,41 @@
+#!/usr/bin/python3
+"""Reports the time of saves back to back in every HBNB_FILE_SYNC mode,
+the way a console script issuing many create commands saves once per
+object, and how many physical writes they turned into.
+
+Usage: python3 -m benchmarks.sync [saves] [count]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+import models
+from models.engine.file_storage import FileStorage
+from models.state import State
+
+
+if __name__ == "__main__":
+    saves = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print("{} saves over {} objects".format(saves, count))
+    for journal in (False, True):
+        for sync in ("always", "batch", "none"):
+            with tempfile.TemporaryDirectory() as tmp:
+                FileStorage._FileStorage__file_path = os.path.join(
+                    tmp, "file.json")
+                FileStorage._FileStorage__journal = journal
+                FileStorage._FileStorage__sync = sync
+                FileStorage._FileStorage__objects = {}
+                for i in range(count):
+                    models.storage.new(State(name="State {}".format(i)))
+                models.storage.save()
+                writes = models.storage.stats()["writes"]
+                start = perf_counter()
+                for i in range(saves):
+                    models.storage.new(State(name="New {}".format(i)))
+                    models.storage.save()
+                models.storage.flush()
+                print("{:8} {:6}  {:.2f}s  {} writes".format(
+                    "journal" if journal else "snapshot", sync,
+                    perf_counter() - start,
+                    models.storage.stats()["writes"] - writes))
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+"""Starts workers processes that each import models (and so reload the
+store) and read a few objects, the way every web_flask process does, then
+reports their startup time and memory while all of them are alive: RSS
+counts the pages a worker maps, PSS splits the pages shared by several
+workers between them.
+
+Usage: python3 -m benchmarks.workers [count] [workers]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.memory import write_file
+from models.engine.serializers import dump_file, load_file
+
+worker = """
+from time import perf_counter
+start = perf_counter()
+import models
+for key in list(models.storage.all("State"))[:10]:
+    models.storage.get("State", key.partition(".")[2]).cities
+print(perf_counter() - start, flush=True)
+input()
+with open("/proc/self/smaps_rollup") as f:
+    fields = dict(line.split()[:2] for line in f if line[0].isupper())
+print(fields["Rss:"], fields["Pss:"])
+"""
+
+
+def run(tmp, env, workers):
+    """Returns the startup seconds, RSS and PSS (KiB) of each worker"""
+    env = dict(os.environ, PYTHONPATH=os.getcwd(), **env)
+    procs = [subprocess.Popen([sys.executable, "-c", worker], cwd=tmp,
+                              env=env, stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    started = [float(proc.stdout.readline()) for proc in procs]
+    memory = [proc.communicate("\n")[0].split() for proc in procs]
+    return [(s, int(rss), int(pss)) for s, (rss, pss) in zip(started, memory)]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "file.json")
+        write_file(path, count)
+        modes = [("default, json", {}, "json"),
+                 ("lazy, json", {"HBNB_FILE_LAZY": "1"}, "json"),
+                 ("mmap, binary", {"HBNB_FILE_MMAP": "1"}, "binary")]
+        print("{} objects, {} workers".format(count, workers))
+        for name, env, fmt in modes:
+            dump_file(list(load_file(path)), path + ".tmp", fmt)
+            os.replace(path + ".tmp", path)
+            stats = run(tmp, env, workers)
+            print("{:14} startup {:.2f}s  RSS {:4.0f} MiB/worker  "
+                  "PSS total {:4.0f} MiB".format(
+                      name, max(s for s, _, _ in stats),
+                      sum(r for _, r, _ in stats) / workers / 1024,
+                      sum(p for _, _, p in stats) / 1024))
@@ -115,6 +115,34 @@ class HBNBCommand(cmd.Cmd):
         """ Overrides the emptyline method of CMD """
         pass
 
+    def parse_params(self, params_str):
+        """ Parses <key>=<value> parameters into a dictionary """
+        name_pattern = r'(?P<name>(?:[a-zA-Z]|_)(?:[a-zA-Z]|\d|_)*)'
+        str_pattern = r'(?P<t_str>"([^"]|\")*")'
+        float_pattern = r'(?P<t_float>[-+]?\d+\.\d+)'
+        int_pattern = r'(?P<t_int>[-+]?\d+)'
+        param_pattern = '{}=({}|{}|{})'.format(
+            name_pattern,
+            str_pattern,
+            float_pattern,
+            int_pattern
+        )
+        obj_kwargs = {}
+        for param in params_str.split(' '):
+            param_match = re.fullmatch(param_pattern, param)
+            if param_match is not None:
+                key_name = param_match.group('name')
+                str_v = param_match.group('t_str')
+                float_v = param_match.group('t_float')
+                int_v = param_match.group('t_int')
+                if float_v is not None:
+                    obj_kwargs[key_name] = float(float_v)
+                if int_v is not None:
+                    obj_kwargs[key_name] = int(int_v)
+                if str_v is not None:
+                    obj_kwargs[key_name] = str_v[1:-1].replace('_', ' ')
+        return obj_kwargs
+
     def do_create(self, args):
         """ Create an object of any class"""
         ignored_attrs = ('id', 'created_at', 'updated_at', '__class__')
@@ -124,30 +152,7 @@ class HBNBCommand(cmd.Cmd):
         obj_kwargs = {}
         if class_match is not None:
             class_name = class_match.group('name')
-            params_str = args[len(class_name):].strip()
-            params = params_str.split(' ')
-            str_pattern = r'(?P<t_str>"([^"]|\")*")'
-            float_pattern = r'(?P<t_float>[-+]?\d+\.\d+)'
-            int_pattern = r'(?P<t_int>[-+]?\d+)'
-            param_pattern = '{}=({}|{}|{})'.format(
-                name_pattern,
-                str_pattern,
-                float_pattern,
-                int_pattern
-            )
-            for param in params:
-                param_match = re.fullmatch(param_pattern, param)
-                if param_match is not None:
-                    key_name = param_match.group('name')
-                    str_v = param_match.group('t_str')
-                    float_v = param_match.group('t_float')
-                    int_v = param_match.group('t_int')
-                    if float_v is not None:
-                        obj_kwargs[key_name] = float(float_v)
-                    if int_v is not None:
-                        obj_kwargs[key_name] = int(int_v)
-                    if str_v is not None:
-                        obj_kwargs[key_name] = str_v[1:-1].replace('_', ' ')
+            obj_kwargs = self.parse_params(args[len(class_name):].strip())
         else:
             class_name = args
         if not class_name:
@@ -201,11 +206,11 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-        try:
-            print(storage.all()[key])
-        except KeyError:
+        obj = storage.get(c_name, c_id)
+        if obj is None:
             print("** no instance found **")
+        else:
+            print(obj)
 
     def help_show(self):
         """ Help information for the show command """
@@ -232,13 +237,12 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        key = c_name + "." + c_id
-
-        try:
-            storage.delete(storage.all()[key])
-            storage.save()
-        except KeyError:
+        obj = storage.get(c_name, c_id)
+        if obj is None:
             print("** no instance found **")
+            return
+        storage.delete(obj)
+        storage.save()
 
     def help_destroy(self):
         """ Help information for the destroy command """
@@ -246,17 +250,25 @@ class HBNBCommand(cmd.Cmd):
         print("[Usage]: destroy <className> <objectId>\n")
 
     def do_all(self, args):
-        """ Shows all objects, or all objects of a class"""
+        """ Shows all objects, or the objects of a class meeting filters"""
         print_list = []
 
         if args:
-            args = args.split(' ')[0]  # remove possible trailing args
-            if args not in HBNBCommand.class_mapping:
+            class_name, _, params_str = args.partition(' ')
+            if class_name not in HBNBCommand.class_mapping:
                 print("** class doesn't exist **")
                 return
-            for k, v in storage.all().items():
-                if k.split('.')[0] == args:
-                    print_list.append(str(v))
+            filters = self.parse_params(params_str)
+            if 'order_by' in filters:  # attribute names keep underscores
+                filters['order_by'] = str(filters['order_by']).replace(
+                    ' ', '_')
+            try:
+                objs = storage.query(class_name, **filters)
+            except (AttributeError, TypeError, ValueError):
+                print("** invalid filter **")
+                return
+            for v in objs:
+                print_list.append(str(v))
         else:
             for k, v in storage.all().items():
                 print_list.append(str(v))
@@ -266,15 +278,15 @@ class HBNBCommand(cmd.Cmd):
     def help_all(self):
         """ Help information for the all command """
         print("Shows all objects, or all of a class")
-        print("[Usage]: all <className>\n")
+        print("Filters are <attr>=<value> or <attr>__<op>=<value>, op being")
+        print("one of lt, lte, gt, gte or ne; order_by=\"<attr>\"")
+        print("(\"-<attr>\" descending), limit=<n> and offset=<n> are also")
+        print("accepted")
+        print("[Usage]: all <className> [<filter> ...]\n")
 
     def do_count(self, args):
         """Count current number of class instances"""
-        count = 0
-        for k, v in storage.all().items():
-            if args == k.split('.')[0]:
-                count += 1
-        print(count)
+        print(storage.count(args))
 
     def help_count(self):
         """ """
@@ -303,11 +315,9 @@ class HBNBCommand(cmd.Cmd):
             print("** instance id missing **")
             return
 
-        # generate key from class and id
-        key = class_name + "." + instance_id
-
-        # determine if key is present
-        if key not in storage.all():
+        # determine if the instance is present
+        new_dict = storage.get(class_name, instance_id)
+        if new_dict is None:
             print("** no instance found **")
             return
 
@@ -340,9 +350,6 @@ class HBNBCommand(cmd.Cmd):
 
             args = [attr_name, attr_val]
 
-        # retrieve dictionary of current objects
-        new_dict = storage.all()[key]
-
         # iterate through attr names and values
         for i, attr_name in enumerate(args):
             # block only runs on even iterations
@@ -368,6 +375,45 @@ class HBNBCommand(cmd.Cmd):
         print("Updates an object with new information")
         print("Usage: update <className> <id> <attrName> <attrVal>\n")
 
+    def do_compact(self, args):
+        """ Folds the storage journal into a fresh snapshot """
+        if hasattr(storage, 'compact'):
+            storage.compact()
+
+    def help_compact(self):
+        """ Help information for the compact command """
+        print("Folds the storage journal into a fresh snapshot")
+        print("[Usage]: compact\n")
+
+    def do_migrate(self, args):
+        """ Creates the missing database tables """
+        if hasattr(storage, 'migrate'):
+            storage.migrate()
+
+    def help_migrate(self):
+        """ Help information for the migrate command """
+        print("Creates the missing database tables, once per deployment")
+        print("[Usage]: migrate\n")
+
+    def do_begin(self, args):
+        """ Defers saving until the matching commit """
+        storage.begin()
+
+    def help_begin(self):
+        """ Help information for the begin command """
+        print("Defers saving until the matching commit, so that the")
+        print("commands in between are saved with a single write")
+        print("[Usage]: begin\n")
+
+    def do_commit(self, args):
+        """ Saves everything deferred since the matching begin """
+        storage.commit()
+
+    def help_commit(self):
+        """ Help information for the commit command """
+        print("Saves everything deferred since the matching begin")
+        print("[Usage]: commit\n")
+
 
 if __name__ == "__main__":
     HBNBCommand().cmdloop()
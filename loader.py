@@ -0,0 +1,102 @@
+#!/usr/bin/python3
+"""
+Imports objects from CSV or JSON Lines files through storage.new_many().
+
+Usage: ./loader.py <file.csv|file.jsonl> [...]
+
+Each CSV row or JSON line holds the attributes of one object, and its
+__class__ column or key names the class (Place, City, Review, ...).
+Missing ids and timestamps are generated, empty CSV cells are left out so
+that one file can mix classes, CSV numbers are cast like the console does,
+and everything is saved once at the end. A row that cannot be built, such
+as one naming an unknown class, is reported on stderr with its file and
+line number and skipped.
+"""
+import csv
+import json
+import sys
+import uuid
+from datetime import datetime
+from itertools import islice
+from time import perf_counter
+from console import HBNBCommand
+from models import storage
+
+
+def read_rows(path):
+    """Yields the (line number, row) pairs of a CSV file, or of a JSON Lines
+    file, whose rows are the lines left to decode"""
+    with open(path, newline='') as f:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    yield number, line
+
+
+def build(row, now):
+    """Builds the object of a row, raising ValueError if it cannot"""
+    if type(row) is str:
+        row = json.loads(row)
+    else:
+        # a CSV row has every column of the file, empty when the row's
+        # class does not have that attribute
+        row = {name: value for name, value in row.items()
+               if name is not None and value not in ('', None)}
+    if type(row) is not dict:
+        raise ValueError("not an object")
+    name = row.pop('__class__', None)
+    if name not in HBNBCommand.class_mapping:
+        raise ValueError("unknown class {!r}".format(name))
+    cls = HBNBCommand.class_mapping[name]
+    for name, cast in HBNBCommand.type_casts.items():
+        if type(row.get(name)) is str and row[name]:
+            row[name] = cast(row[name])
+    row.setdefault('id', str(uuid.uuid4()))
+    row.setdefault('created_at', now)
+    row.setdefault('updated_at', row['created_at'])
+    return cls.from_dict(row)
+
+
+def build_rows(path, now, skipped):
+    """Yields the objects of the rows of a file, reporting the rows that
+    cannot be built and appending their (path, line number) to skipped"""
+    for number, row in read_rows(path):
+        try:
+            yield build(row, now)
+        except (TypeError, ValueError) as error:
+            print("{}:{}: skipped: {}".format(path, number, error),
+                  file=sys.stderr)
+            skipped.append((path, number))
+
+
+def load(paths, chunk_size=10000):
+    """Imports the files, returning the numbers of objects created and of
+    rows skipped"""
+    now = datetime.now()
+    total = 0
+    skipped = []
+    for path in paths:
+        objs = build_rows(path, now, skipped)
+        while True:
+            count = storage.new_many(islice(objs, chunk_size))
+            if not count:
+                break
+            total += count
+    storage.save()
+    return total, len(skipped)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: {} <file.csv|file.jsonl> [...]".format(sys.argv[0]),
+              file=sys.stderr)
+        sys.exit(1)
+    start = perf_counter()
+    total, skipped = load(sys.argv[1:])
+    seconds = perf_counter() - start
+    print("{} objects in {:.2f}s ({:.0f}/s), {} rows skipped".format(
+        total, seconds, total / seconds if seconds else 0, skipped))
@@ -11,6 +11,8 @@ import uuid
 from os import getenv
 
 time_fmt = "%Y-%m-%dT%H:%M:%S.%f"
+stored_keys = {"id", "created_at", "updated_at"}
+property_names = {}
 
 if getenv("HBNB_TYPE_STORAGE") == 'db':
     Base = declarative_base()
@@ -18,6 +20,29 @@ else:
     Base = object
 
 
+def parse_time(value):
+    """Parses a time_fmt timestamp, taking the fast ISO-8601 parser only for
+    strings of exactly that shape so that anything else is left to strptime"""
+    if (len(value) == 26 and value[10] == "T" and value[19] == "." and
+            value[4] == value[7] == "-" and value[20:].isdigit()):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, time_fmt)
+
+
+def properties(cls):
+    """Returns the names of the properties of cls, which from_dict() has to
+    assign through setattr"""
+    names = property_names.get(cls)
+    if names is None:
+        names = property_names[cls] = {
+            name for name in dir(cls)
+            if isinstance(getattr(cls, name, None), property)}
+    return names
+
+
 class BaseModel:
     """The BaseModel class from which future classes will be derived"""
 
@@ -25,9 +50,15 @@ class BaseModel:
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
         updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    else:
+        # _stored is set by FileStorage once it holds the instance; a slot
+        # keeps it out of __dict__ and so out of to_dict() and str()
+        __slots__ = ("_stored", "__dict__", "__weakref__")
 
     def __init__(self, *args, **kwargs):
         """Initialization of the base model"""
+        if Base is object:
+            object.__setattr__(self, "_stored", False)
         self.id = str(uuid.uuid4())
         self.created_at = datetime.now()
         self.updated_at = self.created_at
@@ -35,10 +66,44 @@ class BaseModel:
             if key == '__class__':
                 continue
             setattr(self, key, value)
-            if type(self.created_at) is str:
-                self.created_at = datetime.strptime(self.created_at, time_fmt)
-            if type(self.updated_at) is str:
-                self.updated_at = datetime.strptime(self.updated_at, time_fmt)
+        if type(self.created_at) is str:
+            self.created_at = parse_time(self.created_at)
+        if type(self.updated_at) is str:
+            self.updated_at = parse_time(self.updated_at)
+
+    @classmethod
+    def from_dict(cls, record, inline=False):
+        """Builds an instance from a to_dict() record, such as one read back
+        from storage, parsing each timestamp once. With inline, attributes
+        are stored in the instance without materializing its __dict__,
+        which is slower but smaller"""
+        if Base is not object or not stored_keys <= record.keys():
+            return cls(**record)
+        obj = cls.__new__(cls)
+        object.__setattr__(obj, "_stored", False)
+        attrs = {} if inline else obj.__dict__
+        setters = properties(cls)
+        for key, value in record.items():
+            if key in setters:
+                setattr(obj, key, value)
+            elif key != '__class__':
+                attrs[key] = value
+        if type(attrs["created_at"]) is str:
+            attrs["created_at"] = parse_time(attrs["created_at"])
+        if type(attrs["updated_at"]) is str:
+            attrs["updated_at"] = parse_time(attrs["updated_at"])
+        if inline:
+            for key, value in attrs.items():
+                object.__setattr__(obj, key, value)
+        return obj
+
+    if getenv("HBNB_TYPE_STORAGE") != 'db':
+        def __setattr__(self, name, value):
+            """Sets an attribute and, once storage holds the instance, lets
+            it refresh its indexes"""
+            object.__setattr__(self, name, value)
+            if self._stored:
+                models.storage.touch(self, name)
 
     def __str__(self):
         """String representation of the BaseModel class"""
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+"""
+Converts a FileStorage snapshot of either format into the given format.
+The target may be the source itself, e.g. file.json, which is the only
+snapshot FileStorage reads: the converted file is written next to it and
+then atomically replaces it.
+
+Usage: python3 -m models.engine.convert <json|binary> <source> <target>
+"""
+
+import os
+import sys
+import tempfile
+from models.engine.serializers import dump_file, formats, load_file
+
+
+def convert(format, source, target):
+    """
+    Writes the records of the source snapshot to the target in format,
+    through a temporary file in the target's directory.
+
+    Args:
+        format (str): "json" or "binary".
+        source (str): The path of the snapshot to read.
+        target (str): The path of the snapshot to write.
+    """
+    directory, name = os.path.split(target)
+    fd, tmp_path = tempfile.mkstemp(prefix=name + ".", dir=directory or ".")
+    os.close(fd)
+    try:
+        mode = os.stat(target).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    try:
+        os.chmod(tmp_path, mode)
+        dump_file(load_file(source), tmp_path, format)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in formats:
+        print("Usage: python3 -m models.engine.convert <json|binary> "
+              "<source> <target>", file=sys.stderr)
+        sys.exit(1)
+    convert(*sys.argv[1:])
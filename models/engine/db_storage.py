@@ -4,15 +4,23 @@ connection.
 """
 
 import os
+import threading
+from contextlib import contextmanager
+from time import perf_counter
 from models.base_model import Base
 from models.amenity import Amenity
 from models.city import City
-from models.place import Place
+from models.engine.filters import operators, parse_filters, parse_order
+from models.place import Place, place_amenity
 from models.state import State
 from models.review import Review
 from models.user import User
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import create_engine, delete, event, insert, inspect, \
+    null, select, type_coerce, union_all
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.orm import aliased, joinedload, make_transient_to_detached, \
+    selectinload, sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 name2class = {
     'Amenity': Amenity,
     'City': City,
@@ -21,12 +29,103 @@ name2class = {
     'Review': Review,
     'User': User
 }
+cascades = {
+    'City': ((Place, 'city_id'),),
+    'Place': ((Review, 'place_id'),),
+    'State': ((City, 'state_id'),),
+    'User': ((Place, 'user_id'), (Review, 'user_id')),
+}
+links = {
+    'Amenity': place_amenity.c.amenity_id,
+    'Place': place_amenity.c.place_id,
+}
+load_profiles = {
+    'hbnb': {
+        'State': ('cities',),
+        'Place': ('user', 'reviews.user', 'amenities'),
+    },
+}
+pool_options = {
+    'pool_size': ('HBNB_MYSQL_POOL_SIZE', int),
+    'max_overflow': ('HBNB_MYSQL_MAX_OVERFLOW', int),
+    'pool_recycle': ('HBNB_MYSQL_POOL_RECYCLE', int),
+    'pool_timeout': ('HBNB_MYSQL_POOL_TIMEOUT', float),
+    'pool_pre_ping': ('HBNB_MYSQL_POOL_PRE_PING', lambda value: value == '1'),
+}
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool counting its checkouts and timeouts and timing how long
+    each checkout waited, opening a new connection included"""
+
+    def __init__(self, *args, **kwargs):
+        """initializes the pool and its counters"""
+        super().__init__(*args, **kwargs)
+        self.metrics = {'checkouts': 0, 'timeouts': 0,
+                        'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+        self.lock = threading.Lock()
+
+    def connect(self):
+        """checks a connection out, timing the wait"""
+        start = perf_counter()
+        try:
+            connection = super().connect()
+        except TimeoutError:
+            with self.lock:
+                self.metrics['timeouts'] += 1
+            raise
+        wait = perf_counter() - start
+        with self.lock:
+            metrics = self.metrics
+            metrics['checkouts'] += 1
+            metrics['wait_seconds'] += wait
+            if wait > metrics['max_wait_seconds']:
+                metrics['max_wait_seconds'] = wait
+        return connection
+
+    def recreate(self):
+        """returns a new pool keeping the counters, as dispose() does"""
+        pool = super().recreate()
+        pool.metrics, pool.lock = self.metrics, self.lock
+        return pool
 
 
 class DBStorage:
-    """Database Storage"""
+    """Database Storage
+
+    The session's unit of work already tracks dirty objects and autoflush
+    writes only those; the number of objects each save() flushed is
+    reported by stats(). Between begin() and commit(), save() leaves
+    the transaction open so that the batch is committed once.
+
+    all() without a class runs one query per class, unless HBNB_DB_ALL
+    is "union", which reads every table with a single statement.
+
+    all() and query() take a load argument naming relationships to load
+    eagerly, e.g. ['user', 'reviews.user'], or a profile of
+    load_profiles; collections are loaded with one SELECT ... IN per
+    relationship and many-to-one relationships are joined in.
+
+    The connection pool is tuned with HBNB_MYSQL_POOL_SIZE,
+    HBNB_MYSQL_MAX_OVERFLOW, HBNB_MYSQL_POOL_RECYCLE (seconds),
+    HBNB_MYSQL_POOL_TIMEOUT (seconds) and HBNB_MYSQL_POOL_PRE_PING=1;
+    stats() reports its usage.
+
+    get() looks objects up by primary key, in the session's identity map
+    before the database. HBNB_DB_CACHE=<n> adds a process-level
+    read-through cache of the columns of up to n objects, shared by all
+    sessions and invalidated by this process' new(), deletes and flushes
+    only; changes made by other processes are not seen until evicted.
+    """
     __engine = None
     __session = None
+    __flushed = 0
+    __saved = 0
+    __depth = 0
+    __timings = {}
+    __union = False
+    __cache = None
+    __cache_size = 0
 
     def __init__(self):
         """Initializes the object"""
@@ -34,60 +133,332 @@ class DBStorage:
         passwd = os.getenv('HBNB_MYSQL_PWD')
         host = os.getenv('HBNB_MYSQL_HOST')
         database = os.getenv('HBNB_MYSQL_DB')
+        options = {key: cast(os.getenv(var))
+                   for key, (var, cast) in pool_options.items()
+                   if os.getenv(var)}
         self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'
-                                      .format(user, passwd, host, database))
+                                      .format(user, passwd, host, database),
+                                      poolclass=MeteredQueuePool, **options)
+        self.__union = os.getenv('HBNB_DB_ALL') == 'union'
+        self.__cache_size = int(os.getenv('HBNB_DB_CACHE', 0))
+        if self.__cache_size > 0:
+            self.__cache = {}
+            self.__cache_lock = threading.Lock()
         if os.getenv('HBNB_ENV') == 'test':
             Base.metadata.drop_all(self.__engine)
+            self.migrate()
+        session_factory = sessionmaker(bind=self.__engine,
+                                       expire_on_commit=False)
+        event.listen(session_factory, 'after_flush', self.__count_flushed)
+        self.__session = scoped_session(session_factory)
 
-    def all(self, cls=None):
-        """returns a dictionary of all the objects present"""
-        if not self.__session:
-            self.reload()
+    def all(self, cls=None, load=None):
+        """returns a dictionary of all the objects present; without a class,
+        the time spent on each class is reported by stats()"""
         objects = {}
         if type(cls) == str:
             cls = name2class.get(cls, None)
         if cls:
-            for obj in self.__session.query(cls):
+            query = self.__session.query(cls)
+            for obj in query.options(*self.__load_options(cls, load)):
                 objects[obj.__class__.__name__ + '.' + obj.id] = obj
+        elif self.__union:
+            self.__all_at_once(objects, load)
         else:
+            start = perf_counter()
+            timings = {}
             for cls in name2class.values():
-                for obj in self.__session.query(cls):
+                mark = perf_counter()
+                rows = 0
+                query = self.__session.query(cls)
+                for obj in query.options(*self.__load_options(cls, load)):
                     objects[obj.__class__.__name__ + '.' + obj.id] = obj
+                    rows += 1
+                timings[cls.__name__] = {'rows': rows,
+                                         'seconds': perf_counter() - mark}
+            self.__timings = {'statements': len(name2class),
+                              'seconds': perf_counter() - start,
+                              'classes': timings}
         return objects
 
+    def __load_options(self, cls, load, name=None):
+        """returns the loader options of the relationship paths of load, or
+        of those its profile lists for cls, named name when aliased"""
+        if isinstance(load, str):
+            load = load_profiles[load].get(name or cls.__name__, ())
+        options = []
+        for path in load or ():
+            option, model = None, cls
+            for key in path.split('.'):
+                attr = getattr(model, key)
+                relation = attr.property
+                loader = selectinload if relation.uselist else joinedload
+                if option is None:
+                    option = loader(attr)
+                else:
+                    option = getattr(option, loader.__name__)(attr)
+                model = relation.mapper.class_
+            options.append(option)
+        return options
+
+    def __all_at_once(self, objects, load=None):
+        """fills objects from one UNION ALL statement over every table, so
+        that all() takes a single round trip: each class is mapped onto
+        the union with its own id column, the columns its table lacks
+        being NULL, and only the entity whose id is set loads per row"""
+        types = {}
+        for cls in name2class.values():
+            for column in cls.__table__.columns:
+                if not column.primary_key:
+                    types.setdefault(column.key, column.type)
+        ids = {name: 'id_' + name for name in name2class}
+        branches = []
+        for name, cls in name2class.items():
+            columns = cls.__table__.c
+            branches.append(select(
+                *(columns.id.label(label) if other == name else
+                  type_coerce(null(), columns.id.type).label(label)
+                  for other, label in ids.items()),
+                *(columns[key].label(key) if key in columns else
+                  type_coerce(null(), types[key]).label(key)
+                  for key in types)))
+        union = union_all(*branches).subquery()
+        entities = [aliased(cls, union) for cls in name2class.values()]
+        options = [option for name, entity in zip(name2class, entities)
+                   for option in self.__load_options(entity, load, name)]
+        timings = {name: {'rows': 0, 'seconds': 0.0} for name in name2class}
+        start = perf_counter()
+        # loader options run their own queries while the rows are read,
+        # which a server-side cursor (yield_per) does not allow on MySQLdb
+        result = self.__session.execute(
+            select(*entities).options(*options),
+            execution_options={} if options else {'yield_per': 1000})
+        mark = perf_counter()
+        query_seconds = mark - start
+        current = None
+        for row in result:
+            for obj in row:
+                if obj is not None:
+                    break
+            name = obj.__class__.__name__
+            if name != current:
+                now = perf_counter()
+                if current:
+                    timings[current]['seconds'] += now - mark
+                current, mark = name, now
+                timing = timings[name]
+            timing['rows'] += 1
+            objects[name + '.' + obj.id] = obj
+        if current:
+            timings[current]['seconds'] += perf_counter() - mark
+        self.__timings = {'statements': 1, 'query_seconds': query_seconds,
+                          'seconds': perf_counter() - start,
+                          'classes': timings}
+
     def reload(self):
-        """reloads objects from the database"""
-        session_factory = sessionmaker(bind=self.__engine,
-                                       expire_on_commit=False)
+        """starts a fresh session, so that objects are read again from the
+        database; the session factory is built once, in __init__"""
+        self.__session.remove()
+
+    def migrate(self):
+        """creates the missing tables; a one-time step when deploying, e.g.
+        with the console's migrate command, rather than on every reload"""
         Base.metadata.create_all(self.__engine)
-        self.__session = scoped_session(session_factory)
 
     def new(self, obj):
         """creates a new object"""
         self.__session.add(obj)
+        self.__uncache(obj)
+
+    def new_many(self, objs):
+        """inserts many objects with one executemany INSERT per class
+        instead of going through the unit of work, which leaves them out
+        of the session; returns the number of objects inserted"""
+        groups = {}
+        for obj in objs:
+            groups.setdefault(type(obj), []).append(obj)
+        total = 0
+        for cls, group in groups.items():
+            columns = set(inspect(cls).column_attrs.keys())
+            rows = [{key: value for key, value in obj.__dict__.items()
+                     if key in columns} for obj in group]
+            self.__session.execute(insert(cls), rows)
+            total += len(rows)
+            for obj in group:
+                self.__uncache(obj)
+        self.__flushed += total
+        return total
 
     def save(self):
-        """saves the current session"""
+        """saves the current session, unless a batch is open"""
+        if self.__depth:
+            return
         self.__session.commit()
+        self.__saved = self.__flushed
+        self.__flushed = 0
+
+    def begin(self):
+        """starts a batch that defers save() until the matching commit()"""
+        self.__depth += 1
+
+    def commit(self):
+        """ends a batch, committing the session once the outermost ends"""
+        if self.__depth:
+            self.__depth -= 1
+        self.save()
+
+    @contextmanager
+    def batch(self):
+        """runs the block of a with statement as a batch"""
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.commit()
+
+    def __count_flushed(self, session, flush_context):
+        """counts the new, modified and deleted objects of a flush"""
+        self.__flushed += len(session.new) + len(session.deleted) + \
+            sum(1 for obj in session.dirty if session.is_modified(obj))
+        if self.__cache:
+            for obj in (*session.new, *session.dirty, *session.deleted):
+                self.__uncache(obj)
+
+    def __uncache(self, obj):
+        """drops an object from the cache of get()"""
+        if self.__cache is not None:
+            with self.__cache_lock:
+                self.__cache.pop((type(obj).__name__, obj.id), None)
+
+    @contextmanager
+    def count_queries(self):
+        """counts the statements sent to the database within a with block;
+        yields the list of their SQL, which grows as they run"""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, many):
+            statements.append(statement)
+        event.listen(self.__engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(self.__engine, 'before_cursor_execute', record)
+
+    def stats(self):
+        """returns counters describing the storage activity"""
+        pool = self.__engine.pool
+        metrics = dict(getattr(pool, 'metrics', {}))
+        if isinstance(pool, QueuePool):
+            metrics.update(size=pool.size(), checked_in=pool.checkedin(),
+                           checked_out=pool.checkedout(),
+                           overflow=pool.overflow())
+            if 'checkouts' in metrics:
+                metrics['checkins'] = metrics['checkouts'] - \
+                    metrics['checked_out']
+        return {"saved": self.__saved, "all": self.__timings,
+                "pool": metrics}
 
     def delete(self, obj=None):
-        """deletes an object"""
-        if not self.__session:
-            self.reload()
+        """deletes an object and the rows that depend on it"""
         if obj:
-            self.__session.delete(obj)
+            self.delete_many(type(obj), [obj.id])
+
+    def delete_many(self, cls, ids):
+        """deletes the rows of cls with the given ids, or matching a SQL
+        criterion or a predicate, and the rows that depend on them, with
+        one DELETE per table instead of loading the rows; returns the
+        number of rows deleted"""
+        if isinstance(cls, str):
+            cls = name2class[cls]
+        if callable(ids) and not hasattr(ids, '__clause_element__'):
+            ids = [obj.id for obj in self.__session.query(cls) if ids(obj)]
+        if hasattr(ids, '__clause_element__') or hasattr(ids, 'compile'):
+            where = ids
+        else:
+            where = cls.id.in_(list(ids))
+        statements = []
+        self.__cascade(cls, where, statements)
+        total = 0
+        for model, where in reversed(statements):
+            if model.__name__ in links:
+                self.__session.execute(delete(place_amenity).where(
+                    links[model.__name__].in_(select(model.id).where(where))))
+            total += self.__session.execute(
+                delete(model).where(where),
+                execution_options={'synchronize_session': 'fetch'}).rowcount
+        if self.__cache:
+            with self.__cache_lock:
+                self.__cache.clear()
+        return total
+
+    def __cascade(self, cls, where, statements):
+        """lists the (class, criterion) pairs of the rows to delete,
+        parents before the rows that depend on them"""
+        statements.append((cls, where))
+        for child, column in cascades.get(cls.__name__, ()):
+            self.__cascade(child, getattr(child, column).in_(
+                select(cls.id).where(where)), statements)
 
     def close(self):
         """Dispose of current session if active"""
         self.__session.remove()
 
+    def query(self, cls, order_by=None, limit=None, offset=0, load=None,
+              **filters):
+        """returns the objects of cls that meet the filters, translated
+        into SQL WHERE, ORDER BY, LIMIT and OFFSET clauses; a class that
+        has no table, such as BaseModel, has no objects"""
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if cls not in name2class:
+            return []
+        cls = name2class[cls]
+        statement = select(cls).options(*self.__load_options(cls, load))
+        for attr, op, value in parse_filters(filters):
+            column = getattr(cls, attr)
+            if op == 'in':
+                statement = statement.where(column.in_(value))
+            else:
+                statement = statement.where(operators[op](column, value))
+        for attr, descending in parse_order(order_by):
+            column = getattr(cls, attr)
+            statement = statement.order_by(
+                column.desc() if descending else column)
+        if offset:
+            statement = statement.offset(offset)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return list(self.__session.scalars(statement))
+
     def get(self, cls, id):
-        """Retrieve an object"""
+        """Retrieve an object by primary key, without a round trip when it
+        is in the session or, with HBNB_DB_CACHE set, in the cache"""
         if cls is not None and type(cls) is str and id is not None and\
            type(id) is str and cls in name2class:
-            cls = name2class[cls]
-            result = self.__session.query(cls).filter(cls.id == id).first()
-            return result
+            session = self.__session
+            model = name2class[cls]
+            if self.__cache is None:
+                return session.get(model, id)
+            mapper = inspect(model)
+            if mapper.identity_key_from_primary_key((id,)) not in \
+                    session.identity_map:
+                values = self.__cache.get((cls, id))
+                if values is not None:
+                    obj = mapper.class_manager.new_instance()
+                    obj.__dict__.update(values)
+                    make_transient_to_detached(obj)
+                    session.add(obj)
+                    return obj
+            obj = session.get(model, id)
+            if obj is not None and obj not in session.dirty:
+                columns = mapper.column_attrs.keys()
+                values = {key: obj.__dict__[key] for key in columns
+                          if key in obj.__dict__}
+                with self.__cache_lock:
+                    if len(self.__cache) >= self.__cache_size:
+                        del self.__cache[next(iter(self.__cache))]
+                    self.__cache[(cls, id)] = values
+            return obj
         else:
             return None
 
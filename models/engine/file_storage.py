@@ -4,11 +4,22 @@ Contains the FileStorage class for serializing and deserializing instances
 to and from a JSON file.
 """
 
+import atexit
+import fcntl
 import json
+import os
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from itertools import islice
 from models.amenity import Amenity
 from models.base_model import BaseModel
 from models.city import City
 from models.place import Place
+from models.engine.filters import match, parse_filters, sort_objects
+from models.engine.serializers import Encoded, MappedSnapshot, dump_file, \
+    load_file
 from models.review import Review
 from models.state import State
 from models.user import User
@@ -23,15 +34,114 @@ classes = {
     "User": User
 }
 
+relations = {
+    "Amenity": ("place_id",),
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id"),
+    "Review": ("place_id", "user_id"),
+}
+
+cascades = {
+    "City": (("Place", "city_id"),),
+    "Place": (("Review", "place_id"),),
+    "State": (("City", "state_id"),),
+    "User": (("Place", "user_id"), ("Review", "user_id")),
+}
+
 
 class FileStorage:
     """Handles serialization and deserialization
-    of instances to a JSON file."""
+    of instances to a JSON file.
+
+    new(), delete() and attribute assignments on stored objects mark keys
+    dirty, and save() only serializes the dirty objects. Built objects do
+    not keep their raw record around: the clean ones are serialized again
+    on a full save, which the journal mode never needs.
+
+    When HBNB_FILE_JOURNAL=1, save() appends only the dirty records to a
+    journal (<file_path>.log, one JSON object per line) instead of
+    rewriting the whole file, and reload() replays that journal on top of
+    the last snapshot.
+
+    Once the journal holds HBNB_JOURNAL_MAX_RECORDS records or
+    HBNB_JOURNAL_MAX_BYTES bytes, a background thread folds it into a
+    fresh snapshot (see compact()).
+
+    A class name -> {key: obj} index is kept next to __objects so that
+    all(cls) and count(cls) only touch the objects of that class, and the
+    foreign keys listed in relations get a reverse (class, field) ->
+    {value: {key: obj}} index that backs related().
+
+    When HBNB_FILE_LAZY=1, reload() only keeps the raw records; an object
+    is built the first time get(), all() or a relationship reaches it and
+    stays cached in __objects afterwards. Until then its index entries
+    hold None.
+
+    delete() and delete_many() also delete the objects that depend on
+    the deleted ones through the foreign keys listed in cascades: the
+    Cities of a State, the Places of a City or a User, the Reviews of a
+    Place or a User.
+
+    When HBNB_FILE_COMPACT=1, foreign key strings are interned, an
+    unchanged updated_at shares the created_at datetime and the foreign
+    keys of loaded objects are only indexed the first time related()
+    asks for their class.
+
+    HBNB_FILE_FORMAT picks the format snapshots are written in: "json"
+    (the default) or "binary" (see serializers.BinaryWriter). reload()
+    reads either, so switching formats only takes effect on the next
+    full write; the journal is JSON lines in both.
+
+    When HBNB_FILE_MMAP=1 and the snapshot is binary, reload() maps it
+    read-only and only reads the index at its end: every record starts
+    out as its offset in the mapping and is decoded on first access, and
+    processes reading the same snapshot share its pages through the page
+    cache. The foreign keys of such records are indexed the first time
+    related() asks for their class.
+
+    close() only reloads when the inode, mtime or size of the snapshot
+    or of the journal differs from what this process last read or wrote.
+
+    HBNB_FILE_SYNC sets the durability of writes: "always" (the default)
+    fsyncs every snapshot before it is renamed over the JSON file, and
+    every journal append; "none" skips the fsyncs; "batch" holds saves
+    back for HBNB_FILE_SYNC_WINDOW seconds (0.05 by default) and writes
+    and fsyncs everything saved in that window at once (see flush()).
+
+    Between begin() and commit(), or inside a batch() block, save() does
+    nothing: the dirty objects pile up and are saved once at the end.
+    """
 
     __file_path = "file.json"
     __objects = {}
+    __journal = os.getenv('HBNB_FILE_JOURNAL') == '1'
+    __lazy = os.getenv('HBNB_FILE_LAZY') == '1'
+    __compact = os.getenv('HBNB_FILE_COMPACT') == '1'
+    __format = os.getenv('HBNB_FILE_FORMAT', 'json')
+    __mmap = os.getenv('HBNB_FILE_MMAP') == '1'
+    __snapshot = None
+    __loaded = None
+    __dirty = {}
+    __saved = {}
+    __written = 0
+    __writes = 0
+    __sync = os.getenv('HBNB_FILE_SYNC', 'always')
+    __window = float(os.getenv('HBNB_FILE_SYNC_WINDOW', 0.05))
+    __pending = None
+    __timer = None
+    __depth = 0
+    __max_records = int(os.getenv('HBNB_JOURNAL_MAX_RECORDS', 10000))
+    __max_bytes = int(os.getenv('HBNB_JOURNAL_MAX_BYTES', 16 * 1024 * 1024))
+    __records = 0
+    __lock = threading.Lock()
+    __compactor = None
+    __by_class = {}
+    __by_fk = {}
+    __fk_of = {}
+    __fk_indexed = set()
+    __indexed = None
 
-    def all(self, cls=None):
+    def all(self, cls=None, load=None):
         """
         Returns the dictionary __objects. If cls is provided,
         returns dictionary
@@ -39,23 +149,23 @@ class FileStorage:
 
         Args:
             cls (type or str): The class type or class name to filter objects.
+            load (str or list, optional): The relationships DBStorage would
+                load eagerly; relations are answered from the foreign key
+                index here, so it is ignored.
 
         Returns:
             dict: A dictionary of objects.
         """
         if cls is None:
+            for bucket in self.__classes().values():
+                self.__hydrate_all(bucket)
             return self.__objects
 
-        if isinstance(cls, str):
-            return {
-                k: v for k, v in self.__objects.items()
-                if v.__class__.__name__ == cls
-            }
-
-        return {
-            k: v for k, v in self.__objects.items()
-            if v.__class__ == cls
-        }
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        bucket = self.__classes().get(cls, {})
+        self.__hydrate_all(bucket)
+        return dict(bucket)
 
     def new(self, obj):
         """
@@ -66,37 +176,753 @@ class FileStorage:
         """
         if obj is not None:
             key = f"{obj.__class__.__name__}.{obj.id}"
-            self.__objects[key] = obj
+            self.__put(key, obj)
+            self.__dirty[key] = obj
+
+    def new_many(self, objs):
+        """
+        Sets in __objects many objects at once, as new() does for one,
+        without its per-call overhead.
+
+        Args:
+            objs (iterable): The objects to be added to __objects.
+
+        Returns:
+            int: The number of objects added.
+        """
+        self.__classes()
+        objects, saved, dirty = self.__objects, self.__saved, self.__dirty
+        count = 0
+        for obj in objs:
+            key = f"{obj.__class__.__name__}.{obj.id}"
+            if key in objects or key in saved:
+                self.__unindex(key)
+            self.__index(key, obj)
+            objects[key] = obj
+            dirty[key] = obj
+            count += 1
+        return count
 
     def save(self):
         """
         Serializes __objects to the JSON file (path: __file_path).
+
+        Only dirty objects are serialized. In journal mode only their
+        records are appended to the journal. In batch sync mode the write
+        itself is left to flush(). Inside a batch nothing is saved until
+        it is committed.
+        """
+        if self.__depth:
+            return
+        changes = self.__serialize_dirty()
+        if self.__sync == 'batch':
+            self.__hold(changes)
+        else:
+            self.__persist(changes)
+        for key, record in changes.items():
+            if record is not None and self.__saved.get(key) is record:
+                self.__saved[key] = None
+
+    def begin(self):
+        """
+        Starts a batch: save() is deferred until the matching commit().
+        Batches nest.
+        """
+        FileStorage.__depth += 1
+
+    def commit(self):
+        """
+        Ends a batch; the outermost one saves everything it deferred.
+        Outside a batch it is the same as save().
+        """
+        if self.__depth:
+            FileStorage.__depth -= 1
+        self.save()
+
+    @contextmanager
+    def batch(self):
+        """
+        Returns a context manager that runs its block as a batch.
+
+        Yields:
+            FileStorage: This storage.
+        """
+        self.begin()
+        try:
+            yield self
+        finally:
+            self.commit()
+
+    def flush(self):
+        """
+        Writes the saves held back by the batch sync mode now, as a single
+        physical write.
+        """
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                FileStorage.__timer = None
+            changes = self.__pending
+            FileStorage.__pending = None
+        if changes is not None:
+            self.__persist(changes)
+
+    def __hold(self, changes):
+        """
+        Adds the changed records to the pending batch, starting the timer
+        that flushes it at the end of the window.
+
+        Args:
+            changes (dict): The changed records by key, None for deletions.
+        """
+        with self.__lock:
+            if self.__pending is None:
+                FileStorage.__pending = {}
+            self.__pending.update(changes)
+            if self.__timer is None:
+                FileStorage.__timer = threading.Timer(self.__window,
+                                                      self.flush)
+                FileStorage.__timer.daemon = True
+                FileStorage.__timer.start()
+
+    def __persist(self, changes):
+        """
+        Writes saved changes to disk.
+
+        Args:
+            changes (dict): The changed records by key, None for deletions.
+        """
+        if self.__journal:
+            self.__append_journal(changes)
+        else:
+            self.__write_snapshot()
+
+    def __write_snapshot(self):
         """
-        json_objects = {
-            key: obj.to_dict(save_to_disk=True)
-            for key, obj in self.__objects.items()
-        }
-        with open(self.__file_path, 'w') as f:
-            json.dump(json_objects, f)
+        Writes every saved record to the JSON file and discards the journal
+        it supersedes.
+        """
+        self.wait_compaction()
+        objects, saved, dirty = self.__objects, self.__saved, self.__dirty
+        keys = saved.keys()
+        if self.__sync == 'batch':
+            # flush() may run on the timer thread while saves go on
+            keys = list(keys)
+        # an object deleted since the last save() is left out: a built one
+        # has nothing left to serialize, and the save() of the deletion
+        # drops it from the file anyway
+        records = ((key, self.__encoded(key)) for key in keys
+                   if dirty.get(key, False) is not None and
+                   (saved.get(key) is not None or key in objects))
+        self.__replace_file(records)
+        for path in (self.__journal_path(), self.__journal_path(True)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        FileStorage.__records = 0
+        FileStorage.__loaded = self.__signature()
 
     def reload(self):
         """
-        Deserializes the JSON file to __objects. If the file does not exist,
-        it handles the exception and continues.
+        Deserializes the JSON file to __objects, then replays the journal
+        on top of it. If a file does not exist, it handles the exception
+        and continues.
+
+        Objects whose record is unchanged on disk are kept as they are,
+        changed ones are updated in place so that references to them stay
+        valid, and clean objects whose record is gone from disk are
+        removed.
+        """
+        self.flush()
+        for _ in range(3):
+            snapshot = self.__snapshot_id()
+            signature = self.__signature()
+            changes, records = self.__read_journals()
+            seen = set(changes)
+            try:
+                if not (self.__mmap and self.__load_mapped(changes, seen)):
+                    for key, value in load_file(self.__file_path):
+                        seen.add(key)
+                        if key not in changes:
+                            self.__load(key, value)
+            except FileNotFoundError:
+                pass
+            for key, value in changes.items():
+                self.__load(key, value)
+            # retry if a compaction swapped the snapshot while reading
+            if self.__snapshot_id() == snapshot:
+                break
+        self.__prune(seen)
+        FileStorage.__records = records
+        FileStorage.__loaded = signature
+
+    def compact(self, wait=True):
+        """
+        Folds the journal into a fresh snapshot that atomically replaces
+        the JSON file. In-memory objects are not touched, so readers never
+        wait on a compaction. Compactions and journal appends are
+        serialized across processes by an flock on <file_path>.lock, so
+        saves wait for a running compaction; reload() never starts one,
+        only the save() that grows the journal past its limits does.
+
+        Args:
+            wait (bool): Block until the snapshot is swapped in; otherwise
+                the work is done by a background thread.
+        """
+        with self.__lock:
+            if self.__compactor is None or not self.__compactor.is_alive():
+                FileStorage.__compactor = threading.Thread(
+                    target=self.__fold_journal)
+                FileStorage.__compactor.start()
+            compactor = self.__compactor
+        if wait:
+            compactor.join()
+
+    def wait_compaction(self):
+        """Blocks until a running compaction, if any, has finished."""
+        compactor = self.__compactor
+        if compactor is not None:
+            compactor.join()
+
+    def __journal_path(self, rotated=False):
         """
+        Returns the path of the journal next to the JSON file.
+
+        Args:
+            rotated (bool): Return the path the journal is moved to while
+                a compaction folds it.
+        """
+        path = self.__file_path + ".log"
+        return path + ".compacting" if rotated else path
+
+    def __snapshot_id(self):
+        """Returns the inode of the JSON file, or None if it is missing."""
         try:
-            with open(self.__file_path, 'r') as f:
-                jo = json.load(f)
-            for key, value in jo.items():
-                cls_name = value["__class__"]
-                if cls_name in classes:
-                    self.__objects[key] = classes[cls_name](**value)
+            return os.stat(self.__file_path).st_ino
         except FileNotFoundError:
-            pass
+            return None
+
+    def __signature(self):
+        """
+        Returns the (inode, mtime, size) of the JSON file and of the
+        journals, None for a missing file, as a cheap change signal.
+        """
+        signature = []
+        for path in (self.__file_path, self.__journal_path(),
+                     self.__journal_path(True)):
+            try:
+                st = os.stat(path)
+                signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def __fold_journal(self):
+        """
+        Moves the journal aside, folds it into the snapshot records and
+        swaps the new snapshot in with an atomic rename. A journal left
+        aside by an interrupted compaction is folded before a new one is
+        moved aside. The whole fold holds the compaction lock, so a
+        process waiting on it finds the journal another one just folded
+        gone.
+        """
+        with self.__file_lock():
+            with self.__lock:
+                rotated = self.__journal_path(True)
+                if not os.path.exists(rotated):
+                    try:
+                        os.replace(self.__journal_path(), rotated)
+                    except FileNotFoundError:
+                        return
+                    FileStorage.__records = 0
+            try:
+                snapshot = dict(load_file(self.__file_path))
+            except FileNotFoundError:
+                snapshot = {}
+            with open(rotated, 'r') as f:
+                for key, value in self.__read_journal(f):
+                    if value is None:
+                        snapshot.pop(key, None)
+                    else:
+                        snapshot[key] = value
+            self.__replace_file(snapshot.items())
+            os.remove(rotated)
+
+    @contextmanager
+    def __file_lock(self):
+        """
+        Returns a context manager that holds an exclusive flock on
+        <file_path>.lock, which journal appends and compactions take
+        across processes. It is taken before the thread lock.
+        """
+        with open(self.__file_path + ".lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def __replace_file(self, records):
+        """
+        Streams records into a temporary file, in the configured format,
+        that then atomically replaces the JSON file, so readers never see
+        a partial file. Each write gets a temporary file of its own, so
+        concurrent writers never rename each other's partial files.
+
+        Args:
+            records (iterable): The (key, record) pairs to write.
+        """
+        directory, name = os.path.split(self.__file_path)
+        fd, tmp_path = tempfile.mkstemp(prefix=name + ".",
+                                        dir=directory or ".")
+        os.close(fd)
+        try:
+            mode = os.stat(self.__file_path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        sync = self.__sync != 'none'
+        try:
+            os.chmod(tmp_path, mode)
+            dump_file(records, tmp_path, self.__format, sync)
+            os.replace(tmp_path, self.__file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if sync:
+            fd = os.open(directory or ".", os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        FileStorage.__writes += 1
+
+    def __load(self, key, value, mapped=None):
+        """
+        Applies one stored record to __objects. An object that is already
+        built is updated in place if its record changed, and left alone
+        otherwise; unsaved changes to it are discarded.
+
+        Args:
+            key (str): The <class name>.id key of the record.
+            value (dict or int): The to_dict() output, its offset in
+                mapped, or None for a deletion.
+            mapped (MappedSnapshot): The snapshot an offset points into.
+        """
+        self.__classes()
+        dirty = self.__dirty.pop(key, False) is not False
+        if value is None:
+            self.__drop(key)
+            self.__saved.pop(key, None)
+            return
+        record = value if mapped is None else mapped.record(value)
+        if record["__class__"] not in classes:
+            return
+        obj = self.__objects.get(key)
+        if obj is not None and type(obj) is classes[record["__class__"]]:
+            if dirty or key not in self.__saved or self.__raw(key) != record:
+                self.__saved[key] = value
+                self.__refresh(key, obj, record)
+            elif type(self.__saved[key]) in (dict, int):
+                self.__saved[key] = value
+            return
+        self.__saved[key] = value
+        if self.__lazy or mapped is not None:
+            self.__put(key, None, value)
+        else:
+            self.__put(key, self.__build(key, value))
+
+    def __refresh(self, key, obj, record):
+        """
+        Replaces the attributes of a built object with those of its new
+        record and reindexes it.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            obj (BaseModel): The object.
+            record (dict): The new raw record.
+        """
+        attrs = self.__build(key, record).__dict__
+        obj.__dict__.clear()
+        obj.__dict__.update(attrs)
+        self.__unindex(key)
+        self.__index(key, obj)
+
+    def __prune(self, seen):
+        """
+        Removes the clean objects and records whose key is no longer on
+        disk.
+
+        Args:
+            seen (set): The keys read from the snapshot and the journals.
+        """
+        gone = [key for key in self.__saved
+                if key not in seen and key not in self.__dirty]
+        for key in gone:
+            self.__drop(key)
+            del self.__saved[key]
+
+    def __load_mapped(self, changes, seen):
+        """
+        Maps the snapshot and stores the offsets of its records as their
+        raw records. Records are only decoded for the objects already
+        built, to compare them with their new version.
+
+        Args:
+            changes (dict): The journal records, which supersede the
+                snapshot ones.
+            seen (set): Collects the keys of the snapshot.
+
+        Returns:
+            bool: False if the snapshot is not an indexed binary file.
+        """
+        try:
+            snapshot = MappedSnapshot(self.__file_path)
+        except ValueError:
+            return False
+        self.__classes()
+        saved = self.__saved
+        previous = self.__snapshot
+        for _, keys, _ in snapshot.groups:
+            seen.update(keys)
+        if previous is not None:
+            # decode the records the new snapshot no longer has before
+            # the previous mapping goes away
+            for key, record in list(saved.items()):
+                if type(record) is int and (key not in seen or
+                                            key in changes):
+                    saved[key] = previous.record(record)
+        for cls_name, keys, offsets in snapshot.groups:
+            if cls_name not in classes:
+                continue
+            if self.__by_class.get(cls_name) or self.__dirty:
+                for key, offset in zip(keys, offsets):
+                    if key not in changes:
+                        self.__load(key, offset, snapshot)
+            else:
+                self.__by_class[cls_name] = dict.fromkeys(keys)
+                saved.update(zip(keys, offsets))
+                self.__fk_indexed.discard(cls_name)
+        FileStorage.__snapshot = snapshot
+        if previous is not None:
+            previous.close()
+        return True
+
+    def __encoded(self, key):
+        """
+        Returns the record of a saved key for a snapshot write. The record
+        of a built object is encoded as JSON text and, outside compact
+        mode, kept so that the next full save does not serialize the
+        object again while it stays clean.
+
+        Args:
+            key (str): The <class name>.id key of the record.
+
+        Returns:
+            dict or Encoded: The record.
+        """
+        record = self.__saved.get(key)
+        if type(record) is Encoded:
+            return record
+        if type(record) is int or key not in self.__objects:
+            return self.__raw(key)
+        record = Encoded(json.dumps(self.__raw(key)))
+        if not self.__compact:
+            self.__saved[key] = record
+        return record
+
+    def __raw(self, key):
+        """
+        Returns the raw record of a saved key, decoding it from the mapped
+        snapshot or serializing its object again if needed.
+
+        Args:
+            key (str): The <class name>.id key of the record.
+
+        Returns:
+            dict: The raw record.
+        """
+        record = self.__saved[key]
+        if record is None:
+            return self.__objects[key].to_dict(save_to_disk=True)
+        if type(record) is Encoded:
+            return json.loads(record)
+        if type(record) is int:
+            return self.__snapshot.record(record)
+        return record
+
+    def __build(self, key, record):
+        """
+        Builds the object of a raw record, releasing the record. In
+        compact mode the object shares its repeated values and keeps its
+        attributes inline, without a materialized __dict__.
+
+        Args:
+            key (str): The <class name>.id key of the record.
+            record (dict): The raw record.
+
+        Returns:
+            BaseModel: The object.
+        """
+        self.__saved[key] = None
+        if not self.__compact:
+            return classes[record["__class__"]].from_dict(record)
+        # the ids of the classes foreign keys point at are shared too
+        own_id = "id" if record["__class__"] in cascades else None
+        record = {name: sys.intern(value)
+                  if (name.endswith("_id") or name == own_id) and
+                  type(value) is str else value
+                  for name, value in record.items()}
+        obj = classes[record["__class__"]].from_dict(record, inline=True)
+        if obj.updated_at == obj.created_at:
+            object.__setattr__(obj, "updated_at", obj.created_at)
+        return obj
+
+    def __hydrate(self, key):
+        """
+        Builds the object of a raw record and caches it in __objects and
+        in the indexes.
+
+        Args:
+            key (str): The <class name>.id key of the record.
+
+        Returns:
+            BaseModel: The object.
+        """
+        obj = self.__build(key, self.__raw(key))
+        object.__setattr__(obj, "_stored", True)
+        cls_name = obj.__class__.__name__
+        self.__objects[key] = obj
+        self.__by_class[cls_name][key] = obj
+        for field, value in zip(relations.get(cls_name, ()),
+                                self.__fk_of.get(key, ())):
+            if value is not None:
+                self.__by_fk[(cls_name, field)][value][key] = obj
+        return obj
+
+    def __hydrate_all(self, bucket):
+        """Builds the objects of the raw records left in an index bucket."""
+        for key, obj in bucket.items():
+            if obj is None:
+                self.__hydrate(key)
+
+    def __classes(self):
+        """
+        Returns the class name index, rebuilding it and the foreign key
+        indexes when __objects has been replaced as a whole. All objects
+        of a replaced __objects are then considered dirty.
+        """
+        if FileStorage.__indexed is not self.__objects:
+            FileStorage.__by_class = {}
+            FileStorage.__by_fk = {}
+            FileStorage.__fk_of = {}
+            FileStorage.__fk_indexed = set()
+            FileStorage.__saved = {}
+            FileStorage.__dirty = dict(self.__objects)
+            FileStorage.__indexed = self.__objects
+            for key, obj in self.__objects.items():
+                self.__index(key, obj)
+        return self.__by_class
+
+    def __index(self, key, obj, record=None):
+        """
+        Adds obj to the class index and to its foreign key indexes, and
+        flags it stored so that its assignments are reported to touch().
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            obj (BaseModel): The object, or None for a raw record.
+            record (dict or int): The raw record when obj is None, or its
+                offset in the mapped snapshot.
+        """
+        cls_name = key.partition('.')[0]
+        self.__by_class.setdefault(cls_name, {})[key] = obj
+        if obj is not None:
+            object.__setattr__(obj, "_stored", True)
+        fields = relations.get(cls_name)
+        if obj is None and type(record) is int:
+            # left for __index_fks() to decode when the index is needed
+            self.__fk_indexed.discard(cls_name)
+        elif fields and cls_name in self.__fk_indexed:
+            if obj is None:
+                values = tuple(record.get(field) for field in fields)
+            else:
+                values = tuple(getattr(obj, field, None) for field in fields)
+            if self.__compact:
+                values = tuple(sys.intern(value) if type(value) is str
+                               else value for value in values)
+            for field, value in zip(fields, values):
+                if value is not None:
+                    self.__by_fk.setdefault((cls_name, field), {}) \
+                        .setdefault(value, {})[key] = obj
+            self.__fk_of[key] = values
+
+    def __index_fks(self, cls_name):
+        """
+        Indexes the foreign keys of the objects of a class, which are only
+        indexed once related() or a cascade first needs them.
+        """
+        self.__fk_indexed.add(cls_name)
+        for key, obj in list(self.__by_class.get(cls_name, {}).items()):
+            if key not in self.__fk_of:
+                self.__index(key, obj,
+                             self.__raw(key) if obj is None else None)
+
+    def __unindex(self, key):
+        """Removes key from the class index and its foreign key indexes."""
+        cls_name = key.partition('.')[0]
+        self.__by_class.get(cls_name, {}).pop(key, None)
+        values = self.__fk_of.pop(key, ())
+        for field, value in zip(relations.get(cls_name, ()), values):
+            by_value = self.__by_fk.get((cls_name, field), {})
+            bucket = by_value.get(value)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del by_value[value]
+
+    def __put(self, key, obj, record=None):
+        """
+        Stores obj under key in __objects and in the indexes.
+
+        Args:
+            key (str): The <class name>.id key of the object.
+            obj (BaseModel): The object, or None to keep a raw record.
+            record (dict or int): The raw record when obj is None, or its
+                offset in the mapped snapshot.
+        """
+        self.__classes()
+        self.__unindex(key)
+        self.__index(key, obj, record)
+        if obj is None:
+            self.__objects.pop(key, None)
+        else:
+            self.__objects[key] = obj
+
+    def __drop(self, key):
+        """Removes key from __objects and from the indexes."""
+        self.__classes()
+        self.__objects.pop(key, None)
+        self.__unindex(key)
+
+    def __serialize_dirty(self):
+        """
+        Serializes the dirty objects into the saved records and clears the
+        dirty set.
+
+        Returns:
+            dict: The changed records by key, None for deleted keys.
+        """
+        self.__classes()
+        changes = {}
+        for key, obj in self.__dirty.items():
+            if obj is None:
+                self.__saved.pop(key, None)
+                changes[key] = None
+            else:
+                changes[key] = self.__saved[key] = obj.to_dict(
+                    save_to_disk=True)
+        self.__dirty.clear()
+        FileStorage.__written = len(changes)
+        return changes
+
+    def __append_journal(self, changes):
+        """
+        Appends the changed records to the journal, one line per record.
+
+        Args:
+            changes (dict): The changed records by key, None for deletions.
+        """
+        if not changes:
+            return
+        lines = []
+        for key, value in changes.items():
+            lines.append(json.dumps({"key": key, "value": value}) + "\n")
+        # the file lock keeps a compaction in another process from moving
+        # the journal aside between opening it and writing to it, and
+        # other appenders from writing while a torn tail is trimmed
+        with self.__file_lock(), self.__lock:
+            unchanged = self.__loaded == self.__signature()
+            with open(self.__journal_path(), 'ab+') as f:
+                self.__trim_torn_tail(f)
+                f.write("".join(lines).encode())
+                size = f.tell()
+                if self.__sync != 'none':
+                    f.flush()
+                    os.fsync(f.fileno())
+            FileStorage.__records += len(lines)
+            FileStorage.__writes += 1
+            if unchanged:
+                FileStorage.__loaded = self.__signature()
+        if (self.__records >= self.__max_records or
+                size >= self.__max_bytes):
+            self.compact(wait=False)
+
+    @staticmethod
+    def __trim_torn_tail(f):
+        """
+        Truncates an open journal after its last complete line, dropping
+        the torn line a crash mid-append leaves, so that the next record
+        starts on a line of its own.
+
+        Args:
+            f (file): The journal, opened in binary append mode.
+        """
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(pos, 4096)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                pos += newline + 1 - step
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+    def __read_journals(self):
+        """
+        Reads the journal a compaction moved aside, then the journal.
+
+        Returns:
+            tuple: The last record of each key, None for a deletion, and
+                the number of records read.
+        """
+        changes = {}
+        records = 0
+        for rotated in (True, False):
+            try:
+                with open(self.__journal_path(rotated), 'r') as f:
+                    for key, value in self.__read_journal(f):
+                        changes[key] = value
+                        records += 1
+            except FileNotFoundError:
+                pass
+        return changes, records
+
+    @staticmethod
+    def __read_journal(f):
+        """
+        Yields the (key, value) records of an open journal. A torn line
+        left by a crash mid-append is skipped; a record that an append
+        glued onto such a line is still read.
+        """
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                start = line.rfind('{"key": ', 1)
+                try:
+                    entry = json.loads(line[start:]) if start > 0 else None
+                except ValueError:
+                    entry = None
+                if type(entry) is not dict or "value" not in entry:
+                    continue
+            yield entry["key"], entry["value"]
 
     def delete(self, obj=None):
         """
-        Deletes obj from __objects if it’s inside and saves the changes.
+        Deletes obj from __objects and the indexes if it’s inside, along
+        with the objects that depend on it (see cascades). The deletion is
+        written by the next save(), like any other change.
 
         Args:
             obj (BaseModel): The object to be deleted.
@@ -104,14 +930,147 @@ class FileStorage:
         if obj is not None:
             key = f"{obj.__class__.__name__}.{obj.id}"
             if key in self.__objects:
-                del self.__objects[key]
-                self.save()
+                self.delete_many(obj.__class__.__name__, [obj.id])
+
+    def delete_many(self, cls, ids):
+        """
+        Deletes the objects of class cls with the given ids, or those a
+        predicate accepts, together with the objects that depend on them
+        (see cascades), in one pass over the foreign key indexes. The
+        deletions are written by the next save().
+
+        Args:
+            cls (type or str): The class type or class name of the objects.
+            ids (iterable or callable): The ids of the objects, or a
+                function given each object that returns True for those to
+                delete.
+
+        Returns:
+            int: The number of objects deleted, dependents included.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        bucket = self.__classes().get(cls, {})
+        if callable(ids):
+            self.__hydrate_all(bucket)
+            keys = [key for key, obj in bucket.items() if ids(obj)]
+        else:
+            keys = [key for key in (f"{cls}.{id}" for id in ids)
+                    if key in bucket]
+        doomed = dict.fromkeys(keys)
+        while keys:
+            cls_name, _, id = keys.pop().partition('.')
+            for child, field in cascades.get(cls_name, ()):
+                if child not in self.__fk_indexed:
+                    self.__index_fks(child)
+                for key in self.__by_fk.get((child, field), {}).get(id, ()):
+                    if key not in doomed:
+                        doomed[key] = None
+                        keys.append(key)
+        for key in doomed:
+            self.__drop(key)
+            self.__dirty[key] = None
+        return len(doomed)
 
     def close(self):
         """
-        Call reload() to deserialize the JSON file to objects.
+        Call reload() to deserialize the JSON file to objects, unless
+        the files are unchanged since they were last read or written.
         """
-        self.reload()
+        if (FileStorage.__indexed is not self.__objects or
+                self.__signature() != self.__loaded):
+            self.reload()
+
+    def touch(self, obj, name):
+        """
+        Marks a stored object dirty after one of its attributes has been
+        assigned, refreshing its foreign key indexes if needed.
+
+        Args:
+            obj (BaseModel): The object whose attribute changed.
+            name (str): The name of the assigned attribute.
+        """
+        key = f"{obj.__class__.__name__}.{getattr(obj, 'id', None)}"
+        self.__classes()
+        if self.__objects.get(key) is not obj:
+            return
+        self.__dirty[key] = obj
+        if name in relations.get(obj.__class__.__name__, ()):
+            self.__unindex(key)
+            self.__index(key, obj)
+
+    def stats(self):
+        """
+        Returns counters describing the storage activity.
+
+        Returns:
+            dict: "saved" is the number of objects the last save() wrote,
+                "writes" the number of physical writes to the files.
+        """
+        return {"saved": self.__written, "writes": self.__writes}
+
+    def related(self, cls, attr, id):
+        """
+        Returns the objects of class cls whose foreign key attr equals id.
+
+        Args:
+            cls (type or str): The class type or class name of the objects.
+            attr (str): The foreign key attribute, e.g. "state_id".
+            id (str): The id the foreign key points at.
+
+        Returns:
+            list: The matching objects.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        if attr not in relations.get(cls, ()):
+            return [obj for obj in self.all(cls).values()
+                    if getattr(obj, attr, None) == id]
+        self.__classes()
+        if cls not in self.__fk_indexed:
+            self.__index_fks(cls)
+        bucket = self.__by_fk.get((cls, attr), {}).get(id, {})
+        self.__hydrate_all(bucket)
+        return list(bucket.values())
+
+    def query(self, cls, order_by=None, limit=None, offset=0, load=None,
+              **filters):
+        """
+        Returns the objects of class cls that meet the filters. An equality
+        or "in" filter on a foreign key is answered from the foreign key
+        index, so that only the objects it points at are tested.
+
+        Args:
+            cls (type or str): The class type or class name of the objects.
+            order_by (str or list, optional): The attributes to sort by, a
+                leading "-" sorting in descending order.
+            limit (int, optional): The maximum number of objects returned.
+            offset (int, optional): The number of leading objects skipped.
+            load (str or list, optional): Ignored, as in all().
+            **filters: attr=value, or attr__op=value with op one of lt,
+                lte, gt, gte, ne or in, e.g. price_by_night__lte=100.
+
+        Returns:
+            list: The matching objects.
+        """
+        if not isinstance(cls, str):
+            cls = cls.__name__
+        conditions = parse_filters(filters)
+        candidates = None
+        for attr, op, value in conditions:
+            if attr in relations.get(cls, ()) and op in ("eq", "in"):
+                ids = dict.fromkeys((value,) if op == "eq" else value)
+                candidates = [obj for id in ids
+                              for obj in self.related(cls, attr, id)]
+                break
+        if candidates is None:
+            candidates = self.all(cls).values()
+        found = (obj for obj in candidates if match(obj, conditions))
+        if order_by:
+            found = list(found)
+            sort_objects(found, order_by)
+        stop = None if limit is None else offset + limit
+        return list(islice(found, offset, stop))
 
     def get(self, cls, id):
         """
@@ -127,7 +1086,10 @@ class FileStorage:
         if (cls and isinstance(cls, str) and id and isinstance(id, str) and
                 cls in classes):
             key = f"{cls}.{id}"
-            return self.__objects.get(key, None)
+            obj = self.__objects.get(key)
+            if obj is None and key in self.__classes().get(cls, {}):
+                obj = self.__hydrate(key)
+            return obj
         return None
 
     def count(self, cls=None):
@@ -143,7 +1105,10 @@ class FileStorage:
         """
         t = 0
         if isinstance(cls, str) and cls in classes:
-            t = len(self.all(cls))
+            t = len(self.__classes().get(cls, {}))
         elif cls is None:
-            t = len(self.__objects)
+            t = sum(len(bucket) for bucket in self.__classes().values())
         return t
+
+
+atexit.register(FileStorage().flush)
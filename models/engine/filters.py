@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""Parses the arguments of the query() method of the storage engines.
+
+A filter is written attr=value for equality, or attr__op=value where op
+is one of lt, lte, gt, gte, ne and in, e.g. price_by_night__lte=100 or
+city_id__in=[...]. Both engines share these rules: DBStorage turns them
+into SQL clauses and FileStorage evaluates them with match().
+"""
+import operator
+
+operators = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+}
+
+
+def parse_filters(filters):
+    """
+    Splits keyword filters into (attr, op, value) conditions.
+
+    Args:
+        filters (dict): The keyword filters, e.g. {"max_guest__gte": 4}.
+
+    Returns:
+        list: The conditions; the value of an "in" condition is a tuple.
+
+    Raises:
+        ValueError: If a filter names an unknown operator.
+    """
+    conditions = []
+    for name, value in filters.items():
+        attr, sep, op = name.rpartition("__")
+        if not sep or not attr:
+            attr, op = name, "eq"
+        elif op == "in":
+            value = tuple(value)
+        elif op not in operators:
+            raise ValueError("unknown filter operator: " + name)
+        conditions.append((attr, op, value))
+    return conditions
+
+
+def parse_order(order_by):
+    """
+    Splits the order_by argument into (attr, descending) pairs.
+
+    Args:
+        order_by (str or list): An attribute name or a list of them, a
+            leading "-" sorting that attribute in descending order.
+
+    Returns:
+        list: The sort keys, most significant first.
+    """
+    if not order_by:
+        return []
+    if isinstance(order_by, str):
+        order_by = [order_by]
+    return [(attr[1:], True) if attr.startswith("-") else (attr, False)
+            for attr in order_by]
+
+
+def match(obj, conditions):
+    """
+    Tells whether an object meets all the conditions. Missing attributes
+    read as None, which only equality and "in" conditions can match.
+
+    Args:
+        obj (BaseModel): The object to test.
+        conditions (list): The conditions returned by parse_filters().
+
+    Returns:
+        bool: True if the object meets every condition.
+    """
+    for attr, op, value in conditions:
+        field = getattr(obj, attr, None)
+        if op == "in":
+            if field not in value:
+                return False
+        elif op in ("eq", "ne"):
+            if not operators[op](field, value):
+                return False
+        elif field is None or value is None:
+            return False
+        else:
+            try:
+                if not operators[op](field, value):
+                    return False
+            except TypeError:
+                return False
+    return True
+
+
+def sort_objects(objs, order_by):
+    """
+    Sorts objects in place; None sorts before any value, as in SQL.
+
+    Args:
+        objs (list): The objects to sort.
+        order_by (str or list): The order_by argument of query().
+    """
+    for attr, descending in reversed(parse_order(order_by)):
+        objs.sort(key=lambda obj: (getattr(obj, attr, None) is not None,
+                                   getattr(obj, attr, None)),
+                  reverse=descending)
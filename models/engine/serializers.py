@@ -0,0 +1,569 @@
+#!/usr/bin/python3
+"""
+Contains the readers and writers FileStorage uses for its files.
+"""
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+
+
+class JSONReader:
+    """Reads JSON values from a text file a chunk at a time."""
+
+    whitespace = " \t\n\r"
+
+    def __init__(self, f, chunk_size=1 << 16):
+        """
+        Args:
+            f (file): The file opened for reading text.
+            chunk_size (int): The number of characters read at a time.
+        """
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.scan = json.JSONDecoder().scan_once
+
+    def fill(self):
+        """Reads one more chunk, returning False at the end of the file."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def char(self):
+        """Consumes and returns the next non-whitespace character."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in self.whitespace:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                self.pos += 1
+                return buf[pos]
+            if not self.fill():
+                raise json.JSONDecodeError("Unexpected end of file",
+                                           self.buf, self.pos)
+
+    def value(self):
+        """Decodes the next JSON value, reading on until it is complete."""
+        self.char()
+        self.pos -= 1
+        while True:
+            try:
+                value, end = self.scan(self.buf, self.pos)
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except (StopIteration, json.JSONDecodeError):
+                if self.eof:
+                    raise json.JSONDecodeError("Invalid value",
+                                               self.buf, self.pos)
+            self.fill()
+
+
+def load_json(f, chunk_size=1 << 16):
+    """
+    Parses a JSON object file one top-level entry at a time, so that the
+    whole decoded document is never held in memory. The keys of the
+    records are interned, as json.load() would share them across the
+    document.
+
+    Args:
+        f (file): The file opened for reading text.
+        chunk_size (int): The number of characters read at a time.
+
+    Yields:
+        tuple: The (key, value) pairs of the top-level object, in order.
+
+    Raises:
+        json.JSONDecodeError: If the file does not hold a JSON object.
+    """
+    reader = JSONReader(f, chunk_size)
+    if reader.char() != "{":
+        raise json.JSONDecodeError("Expecting '{'", reader.buf, reader.pos)
+    if reader.char() == "}":
+        return
+    reader.pos -= 1
+    while True:
+        key = reader.value()
+        if type(key) is not str or reader.char() != ":":
+            raise json.JSONDecodeError("Expecting property name",
+                                       reader.buf, reader.pos)
+        value = reader.value()
+        if type(value) is dict:
+            value = dict(zip(map(sys.intern, value), value.values()))
+        yield key, value
+        char = reader.char()
+        if char == "}":
+            return
+        if char != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter",
+                                       reader.buf, reader.pos)
+
+
+class Encoded(str):
+    """A record already encoded as JSON text, which dump_json() writes as
+    it is."""
+
+    __slots__ = ()
+
+
+def dump_json(items, f):
+    """
+    Writes (key, value) pairs as a JSON object one entry at a time, so
+    that the whole document is never built in memory. The output is the
+    same as json.dump(dict(items), f), Encoded values being written as
+    they are.
+
+    Args:
+        items (iterable): The (key, value) pairs, in order.
+        f (file): The file opened for writing text.
+    """
+    encode = json.dumps
+    f.write("{")
+    f.writelines(("{}{}: {}".format(", " if i else "", encode(key),
+                                    value if type(value) is Encoded
+                                    else encode(value))
+                  for i, (key, value) in enumerate(items)))
+    f.write("}")
+
+
+magic = b"HBNB\x01"
+uuid_re = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-"
+                     r"[0-9a-f]{12}")
+entry_head = struct.Struct("<cI")
+u16 = struct.Struct("<H")
+u32 = struct.Struct("<I")
+u64 = struct.Struct("<Q")
+i64 = struct.Struct("<q")
+f64 = struct.Struct("<d")
+NONE, TRUE, FALSE, INT, BIGINT, FLOAT, STR, UUID, LIST, DICT, NAMED_DICT, \
+    NAME = range(12)
+NO_NAME = 0xFFFF
+
+
+class Name(str):
+    """A string written as an index into the name table."""
+
+
+class BinaryWriter:
+    """
+    Writes (key, record) pairs in the binary snapshot format.
+
+    The file is the magic bytes followed by entries, each a kind byte and
+    a 4-byte length. A b"N" entry adds a UTF-8 string to the name table
+    the first time a record needs it; a b"R" entry is a record: the class
+    name of its key as a name index, then its id and its value as typed
+    values. Dict keys and class names are written as 2-byte name indexes
+    and canonical UUID strings as their 16 bytes.
+
+    finish() ends the file with a b"X" entry indexing it: the name table,
+    then for each class name the keys joined by newlines and the offsets
+    of their records, followed by a b"T" entry holding the offset of the
+    b"X" entry. Readers that stream the file skip both.
+    """
+
+    def __init__(self, f):
+        """
+        Args:
+            f (file): The file opened for writing bytes.
+        """
+        self.f = f
+        self.names = {}
+        self.pending = bytearray()
+        self.offset = len(magic)
+        self.groups = {}
+        self.indexable = True
+        f.write(magic)
+
+    def name(self, s):
+        """Returns the name index of s, or None once the table is full."""
+        index = self.names.get(s)
+        if index is None:
+            if len(self.names) >= NO_NAME:
+                return None
+            index = self.names[s] = len(self.names)
+            data = s.encode("utf-8", "surrogatepass")
+            self.pending += entry_head.pack(b"N", len(data)) + data
+        return index
+
+    def value(self, v, out):
+        """Appends the typed encoding of v to out."""
+        t = type(v)
+        if t is str:
+            if len(v) == 36 and uuid_re.fullmatch(v):
+                out.append(UUID)
+                out += bytes.fromhex(v.replace("-", ""))
+            else:
+                data = v.encode("utf-8", "surrogatepass")
+                out.append(STR)
+                out += u32.pack(len(data))
+                out += data
+        elif t is Name:
+            out.append(NAME)
+            out += u16.pack(self.names[v])
+        elif v is None:
+            out.append(NONE)
+        elif v is True:
+            out.append(TRUE)
+        elif v is False:
+            out.append(FALSE)
+        elif t is int:
+            if -(1 << 63) <= v < 1 << 63:
+                out.append(INT)
+                out += i64.pack(v)
+            else:
+                data = str(v).encode()
+                out.append(BIGINT)
+                out += u32.pack(len(data))
+                out += data
+        elif t is float:
+            out.append(FLOAT)
+            out += f64.pack(v)
+        elif t is list:
+            out.append(LIST)
+            out += u32.pack(len(v))
+            for item in v:
+                self.value(item, out)
+        elif t is dict:
+            indexes = [self.name(k) if type(k) is str else None for k in v]
+            if None in indexes:
+                out.append(DICT)
+                out += u32.pack(len(v))
+                for k, item in v.items():
+                    self.value(k, out)
+                    self.value(item, out)
+            else:
+                out.append(NAMED_DICT)
+                out += u32.pack(len(v))
+                for index, item in zip(indexes, v.values()):
+                    out += u16.pack(index)
+                    self.value(item, out)
+        else:
+            raise TypeError("Object of type {} is not serializable"
+                            .format(t.__name__))
+
+    def write(self, key, record):
+        """Writes one (key, record) pair."""
+        out = bytearray()
+        cls_name, dot, id = key.partition(".")
+        index = self.name(cls_name) if dot else None
+        if index is None:
+            out += u16.pack(NO_NAME)
+            self.value(key, out)
+        else:
+            out += u16.pack(index)
+            self.value(id, out)
+        if type(record) is dict and "__class__" in record:
+            # class names are short and repeated in every record
+            record = dict(record)
+            cls_name = record["__class__"]
+            if type(cls_name) is str and self.name(cls_name) is not None:
+                record["__class__"] = Name(cls_name)
+        self.value(record, out)
+        offset = self.offset + len(self.pending)
+        entry = self.pending + entry_head.pack(b"R", len(out)) + out
+        self.f.write(entry)
+        self.offset += len(entry)
+        self.pending.clear()
+        if self.indexable:
+            if "\n" in key:
+                self.indexable = False
+            else:
+                keys, offsets = self.groups.setdefault(
+                    key.partition(".")[0], ([], []))
+                keys.append(key)
+                offsets.append(offset)
+
+    def finish(self):
+        """Writes the index of the records, if every key allows one."""
+        if not self.indexable:
+            return
+        out = bytearray(u32.pack(len(self.names)))
+        for name in self.names:
+            data = name.encode("utf-8", "surrogatepass")
+            out += u32.pack(len(data)) + data
+        out += u32.pack(len(self.groups))
+        for cls_name, (keys, offsets) in self.groups.items():
+            data = cls_name.encode("utf-8", "surrogatepass")
+            blob = "\n".join(keys).encode("utf-8", "surrogatepass")
+            out += u32.pack(len(data)) + data
+            out += u32.pack(len(keys)) + u32.pack(len(blob)) + blob
+            out += struct.pack("<{}Q".format(len(offsets)), *offsets)
+        self.f.write(entry_head.pack(b"X", len(out)) + out +
+                     entry_head.pack(b"T", u64.size) + u64.pack(self.offset))
+
+
+class BinaryReader:
+    """Reads the entries written by BinaryWriter."""
+
+    def __init__(self, f):
+        """
+        Args:
+            f (file): The file opened for reading bytes, past the magic.
+        """
+        self.f = f
+        self.names = []
+
+    def value(self, buf, pos):
+        """Decodes the typed value at pos, returning it and its end."""
+        tag = buf[pos]
+        pos += 1
+        if tag == STR:
+            n = u32.unpack_from(buf, pos)[0]
+            pos += 4
+            return str(buf[pos:pos + n], "utf-8", "surrogatepass"), pos + n
+        if tag == UUID:
+            h = buf[pos:pos + 16].hex()
+            return "{}-{}-{}-{}-{}".format(h[:8], h[8:12], h[12:16],
+                                           h[16:20], h[20:]), pos + 16
+        if tag == NAME:
+            return self.names[u16.unpack_from(buf, pos)[0]], pos + 2
+        if tag == NAMED_DICT:
+            n = u32.unpack_from(buf, pos)[0]
+            pos += 4
+            names = self.names
+            d = {}
+            for _ in range(n):
+                k = names[u16.unpack_from(buf, pos)[0]]
+                d[k], pos = self.value(buf, pos + 2)
+            return d, pos
+        if tag == INT:
+            return i64.unpack_from(buf, pos)[0], pos + 8
+        if tag == FLOAT:
+            return f64.unpack_from(buf, pos)[0], pos + 8
+        if tag == NONE:
+            return None, pos
+        if tag == TRUE:
+            return True, pos
+        if tag == FALSE:
+            return False, pos
+        if tag == LIST:
+            n = u32.unpack_from(buf, pos)[0]
+            pos += 4
+            items = []
+            for _ in range(n):
+                item, pos = self.value(buf, pos)
+                items.append(item)
+            return items, pos
+        if tag == DICT:
+            n = u32.unpack_from(buf, pos)[0]
+            pos += 4
+            d = {}
+            for _ in range(n):
+                k, pos = self.value(buf, pos)
+                d[k], pos = self.value(buf, pos)
+            return d, pos
+        if tag == BIGINT:
+            n = u32.unpack_from(buf, pos)[0]
+            pos += 4
+            return int(buf[pos:pos + n]), pos + n
+        raise ValueError("Unknown value tag {}".format(tag))
+
+    def key(self, buf):
+        """Decodes the key at the start of a record, returning its end."""
+        index = u16.unpack_from(buf, 0)[0]
+        value, pos = self.value(buf, 2)
+        if index != NO_NAME:
+            value = "{}.{}".format(self.names[index], value)
+        return value, pos
+
+    def entries(self):
+        """Yields the (key, record) pairs, reading one entry at a time."""
+        read = self.f.read
+        size = entry_head.size
+        while True:
+            head = read(size)
+            if not head:
+                return
+            if len(head) < size:
+                raise ValueError("Truncated binary snapshot")
+            kind, n = entry_head.unpack(head)
+            buf = read(n)
+            if len(buf) < n:
+                raise ValueError("Truncated binary snapshot")
+            if kind == b"N":
+                self.names.append(sys.intern(buf.decode("utf-8",
+                                                        "surrogatepass")))
+            elif kind == b"R":
+                key, pos = self.key(buf)
+                yield key, self.value(buf, pos)[0]
+            elif kind not in (b"X", b"T"):
+                raise ValueError("Unknown entry kind {!r}".format(kind))
+
+
+def load_binary(f):
+    """
+    Parses a binary snapshot one record at a time.
+
+    Args:
+        f (file): The file opened for reading bytes.
+
+    Yields:
+        tuple: The (key, record) pairs, in order.
+
+    Raises:
+        ValueError: If the file is not a valid binary snapshot.
+    """
+    if f.read(len(magic)) != magic:
+        raise ValueError("Not a binary snapshot")
+    yield from BinaryReader(f).entries()
+
+
+def dump_binary(items, f):
+    """
+    Writes (key, record) pairs as a binary snapshot one at a time.
+    Encoded records are decoded first.
+
+    Args:
+        items (iterable): The (key, record) pairs, in order.
+        f (file): The file opened for writing bytes.
+    """
+    writer = BinaryWriter(f)
+    for key, record in items:
+        if type(record) is Encoded:
+            record = json.loads(record)
+        writer.write(key, record)
+    writer.finish()
+
+
+class MappedSnapshot:
+    """
+    A binary snapshot mapped read-only into memory. Processes mapping the
+    same file share its pages through the page cache; only the index at
+    the end of the file is decoded up front, and a record is decoded when
+    record() reaches it.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): The path of the snapshot.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not an indexed binary snapshot.
+        """
+        with open(path, 'rb') as f:
+            try:
+                self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("Empty snapshot")
+        self.reader = BinaryReader(None)
+        try:
+            self.groups = self.read_index()
+        except (ValueError, struct.error, IndexError):
+            self.map.close()
+            raise ValueError("Not an indexed binary snapshot")
+
+    def read_index(self):
+        """
+        Decodes the index at the end of the file.
+
+        Returns:
+            list: The (class name, keys, offsets) groups of records.
+        """
+        mm = self.map
+        tail = len(mm) - entry_head.size - u64.size
+        if mm[:len(magic)] != magic or tail < len(magic):
+            raise ValueError("Not a binary snapshot")
+        if entry_head.unpack_from(mm, tail) != (b"T", u64.size):
+            raise ValueError("Missing index")
+        pos = u64.unpack_from(mm, tail + entry_head.size)[0]
+        if entry_head.unpack_from(mm, pos)[0] != b"X":
+            raise ValueError("Missing index")
+        pos += entry_head.size
+
+        def text():
+            nonlocal pos
+            n = u32.unpack_from(mm, pos)[0]
+            pos += 4 + n
+            return str(mm[pos - n:pos], "utf-8", "surrogatepass")
+
+        def count():
+            nonlocal pos
+            pos += 4
+            return u32.unpack_from(mm, pos - 4)[0]
+
+        names = self.reader.names
+        for _ in range(count()):
+            names.append(sys.intern(text()))
+        groups = []
+        for _ in range(count()):
+            cls_name = text()
+            n = count()
+            keys = text().split("\n") if n else []
+            offsets = struct.unpack_from("<{}Q".format(n), mm, pos)
+            pos += 8 * n
+            if len(keys) != n:
+                raise ValueError("Corrupt index")
+            groups.append((cls_name, keys, offsets))
+        return groups
+
+    def record(self, offset):
+        """Decodes the record of the b"R" entry at offset."""
+        n = u32.unpack_from(self.map, offset + 1)[0]
+        start = offset + entry_head.size
+        buf = self.map[start:start + n]
+        return self.reader.value(buf, self.reader.key(buf)[1])[0]
+
+    def close(self):
+        """Unmaps the file."""
+        self.map.close()
+
+
+formats = ("json", "binary")
+
+
+def load_file(path):
+    """
+    Yields the (key, record) pairs of a snapshot file, telling its format
+    from its first bytes.
+
+    Args:
+        path (str): The path of the snapshot.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(magic)) == magic:
+            f.seek(0)
+            yield from load_binary(f)
+            return
+    with open(path, 'r') as f:
+        yield from load_json(f)
+
+
+def dump_file(items, path, format="json", sync=False):
+    """
+    Writes (key, record) pairs to a snapshot file.
+
+    Args:
+        items (iterable): The (key, record) pairs, in order.
+        path (str): The path of the snapshot.
+        format (str): "json" or "binary".
+        sync (bool): fsync the file before closing it.
+
+    Raises:
+        ValueError: If format is unknown.
+    """
+    if format not in formats:
+        raise ValueError("Unknown file format {!r}".format(format))
+    with open(path, 'wb' if format == "binary" else 'w') as f:
+        if format == "binary":
+            dump_binary(items, f)
+        else:
+            dump_json(items, f)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
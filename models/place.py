@@ -72,23 +72,18 @@ class Place(BaseModel, Base):
         """initializes Place"""
         super().__init__(*args, **kwargs)
 
-    @property
-    def reviews(self):
-        """attribute that returns list of Review instances"""
-        values_review = models.storage.all("Review").values()
-        list_review = []
-        for review in values_review:
-            if review.place_id == self.id:
-                list_review.append(review)
-        return list_review
-
     if getenv('HBNB_TYPE_STORAGE') != 'db':
+        @property
+        def reviews(self):
+            """attribute that returns list of Review instances"""
+            return models.storage.related("Review", "place_id", self.id)
+
         @property
         def amenities(self):
             """attribute that returns list of Amenity instances"""
-            values_amenity = models.storage.all("Amenity").values()
-            list_amenity = []
-            for amenity in values_amenity:
-                if amenity.place_id == self.id:
-                    list_amenity.append(amenity)
-            return list_amenity
+            return models.storage.related("Amenity", "place_id", self.id)
+
+        @property
+        def user(self):
+            """attribute that returns the User who owns the Place"""
+            return models.storage.get("User", self.user_id)
@@ -29,3 +29,9 @@ class Review(BaseModel, Base):
     def __init__(self, *args, **kwargs):
         """initializes Review"""
         super().__init__(*args, **kwargs)
+
+    if getenv('HBNB_TYPE_STORAGE') != 'db':
+        @property
+        def user(self):
+            """attribute that returns the User who wrote the Review"""
+            return models.storage.get("User", self.user_id)
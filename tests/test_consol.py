@@ -14,11 +14,13 @@ Classes:
     TestHBNBCommand_all: Tests the all command of the HBNB command interpreter.
     TestHBNBCommand_destroy: Tests the destroy command of the HBNB command interpreter.
     TestHBNBCommand_update: Tests the update command of the HBNB command interpreter.
+    TestHBNBCommand_batch: Tests the begin and commit commands of the HBNB command interpreter.
 """
 
 import os
 import sys
 import unittest
+import uuid
 from models import storage
 from models.engine.file_storage import FileStorage
 from console import HBNBCommand
@@ -115,7 +117,8 @@ class TestHBNBCommand_help(unittest.TestCase):
         """Test the general help message."""
         holy = ("Documented commands (type help <topic>):\n"
                 "========================================\n"
-                "EOF  all  count  create  destroy  help  quit  show  update")
+                "EOF  begin   compact  create   help     quit  update\n"
+                "all  commit  count    destroy  migrate  show")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(holy, output.getvalue().strip())
@@ -607,6 +610,19 @@ class TestHBNBCommand_destroy(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd("Review.destroy(1)"))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_destroy_writes_once(self):
+        """Test that destroy writes the storage file a single time."""
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create State"))
+            testID = output.getvalue().strip()
+        writes = storage.stats()["writes"]
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                "destroy State {}".format(testID)))
+        self.assertEqual(writes + 1, storage.stats()["writes"])
+        with open("file.json", "r") as f:
+            self.assertNotIn(testID, f.read())
+
     def test_destroy_objects_space_notation(self):
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("create BaseModel"))
@@ -792,6 +808,39 @@ class TestHBNBCommand_all(unittest.TestCase):
             self.assertIn("Amenity", output.getvalue().strip())
             self.assertIn("Review", output.getvalue().strip())
 
+    def test_all_filters(self):
+        city_id = str(uuid.uuid4())
+        ids = []
+        for guests in (2, 4, 6):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd('create Place city_id="{}" max_guest={}'
+                                     .format(city_id, guests))
+                ids.append(output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                'all Place city_id="{}" max_guest__gte=3 order_by="-max_guest"'
+                .format(city_id)))
+            text = output.getvalue()
+            self.assertNotIn(ids[0], text)
+            self.assertLess(text.index(ids[2]), text.index(ids[1]))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd(
+                'all Place city_id="{}" limit=1'.format(city_id)))
+            self.assertEqual(1, output.getvalue().count("[Place]"))
+
+    def test_all_invalid_filter(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all Place max_guest__x=1"))
+            self.assertEqual("** invalid filter **",
+                             output.getvalue().strip())
+
+    @unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") != "db",
+                     "BaseModel only lacks a table with DBStorage")
+    def test_all_class_without_table(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("all BaseModel"))
+            self.assertEqual("[]", output.getvalue().strip())
+
     def test_all_single_object_space_notation(self):
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("create BaseModel"))
@@ -1585,5 +1634,51 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_batch(unittest.TestCase):
+    """Unit tests for testing the begin and commit commands of the HBNB
+    command interpreter."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+
+    def test_commands_between_begin_and_commit_write_once(self):
+        writes = storage.stats()["writes"]
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("begin")
+            for _ in range(3):
+                HBNBCommand().onecmd("create State")
+            HBNBCommand().onecmd("update State {} name \"Iowa\"".format(
+                output.getvalue().split()[0]))
+            self.assertFalse(os.path.exists("file.json"))
+            self.assertFalse(HBNBCommand().onecmd("commit"))
+        self.assertEqual(writes + 1, storage.stats()["writes"])
+        self.assertEqual(3, storage.count("State"))
+
+    def test_batch_context_manager(self):
+        with storage.batch():
+            with patch("sys.stdout", new=StringIO()):
+                HBNBCommand().onecmd("create City")
+                with storage.batch():
+                    HBNBCommand().onecmd("create City")
+            self.assertFalse(os.path.exists("file.json"))
+        self.assertTrue(os.path.exists("file.json"))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/python3
+"""
+Unittests for the loader module.
+
+This module contains unit tests for the CSV and JSON Lines importer
+defined in the loader.py module.
+
+Classes:
+    TestLoader: Tests importing CSV and JSON Lines files with file storage.
+"""
+
+import json
+import os
+import tempfile
+import unittest
+import loader
+from io import StringIO
+from models import storage
+from models.engine.file_storage import FileStorage
+from models.place import Place
+from models.review import Review
+from unittest.mock import patch
+
+
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "The loader tests read objects back from FileStorage")
+class TestLoader(unittest.TestCase):
+    """Unittests for importing files with loader.load()."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_csv(self):
+        path = self.write("places.csv", "__class__,id,name,max_guest\n"
+                                        "Place,p1,Loft,4\n"
+                                        "Place,p2,Barn,\n")
+        self.assertEqual((2, 0), loader.load([path]))
+        loft = storage.get("Place", "p1")
+        self.assertIsInstance(loft, Place)
+        self.assertEqual(("Loft", 4), (loft.name, loft.max_guest))
+        self.assertEqual(0, storage.get("Place", "p2").max_guest)
+        with open("file.json", "r") as f:
+            self.assertEqual({"Place.p1", "Place.p2"}, set(json.load(f)))
+
+    def test_mixed_classes_csv(self):
+        path = self.write("mixed.csv",
+                          "__class__,id,name,city_id,price_by_night,text\n"
+                          "City,c1,Fremont,,,\n"
+                          "Place,p1,Loft,c1,120,\n"
+                          "Review,r1,,,,ok\n")
+        self.assertEqual((3, 0), loader.load([path]))
+        with open("file.json", "r") as f:
+            records = json.load(f)
+        city = records["City.c1"]
+        self.assertEqual("Fremont", city["name"])
+        for name in ("city_id", "price_by_night", "text"):
+            self.assertNotIn(name, city)
+        self.assertEqual(("c1", 120), (records["Place.p1"]["city_id"],
+                                       records["Place.p1"]["price_by_night"]))
+        self.assertNotIn("text", records["Place.p1"])
+        self.assertEqual("ok", records["Review.r1"]["text"])
+        self.assertNotIn("name", records["Review.r1"])
+
+    def test_jsonl(self):
+        path = self.write("reviews.jsonl",
+                          '{"__class__": "Review", "text": "ok"}\n'
+                          '\n'
+                          '{"__class__": "Place", "id": "p1"}\n')
+        self.assertEqual((2, 0), loader.load([path], chunk_size=1))
+        review, = storage.all(Review).values()
+        self.assertEqual("ok", review.text)
+        self.assertEqual(review.created_at, review.updated_at)
+
+    def test_bad_rows_skipped(self):
+        path = self.write("rows.jsonl",
+                          '{"__class__": "Place", "id": "p1"}\n'
+                          '{"__class__": "Nope", "id": "x"}\n'
+                          '{"__class__": "Place", "id": \n'
+                          '[1, 2]\n'
+                          '{"__class__": "Place", "id": "p2"}\n')
+        csv_path = self.write("rows.csv", "__class__,id,max_guest\n"
+                                          "Place,p3,many\n"
+                                          "Place,p4,2\n")
+        with patch("sys.stderr", new=StringIO()) as output:
+            self.assertEqual((3, 4), loader.load([path, csv_path],
+                                                 chunk_size=1))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertEqual(path + ":2: skipped: unknown class 'Nope'",
+                         lines[0])
+        self.assertTrue(lines[1].startswith(path + ":3: skipped: "))
+        self.assertEqual(path + ":4: skipped: not an object", lines[2])
+        self.assertTrue(lines[3].startswith(csv_path + ":2: skipped: "))
+        self.assertEqual(["Place.p1", "Place.p2", "Place.p4"],
+                         sorted(storage.all(Place)))
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+
+
+if __name__ == "__main__":
+    unittest.main()
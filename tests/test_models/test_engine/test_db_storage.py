@@ -0,0 +1,394 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/db_storage.py.
+
+The tests only run with HBNB_TYPE_STORAGE=db.
+
+Unittest classes:
+    DBStorageTestCase
+    TestDBStorage_load
+    TestDBStorage_all
+    TestDBStorage_delete
+    TestDBStorage_new_many
+    TestDBStorage_pool
+    TestDBStorage_get
+"""
+import os
+import json
+import loader
+import models
+import tempfile
+import unittest
+from contextlib import contextmanager
+from io import StringIO
+from unittest.mock import patch
+from sqlalchemy.exc import TimeoutError
+from models.amenity import Amenity
+from models.city import City
+from models.place import Place
+from models.review import Review
+from models.state import State
+from models.user import User
+
+
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") != "db",
+                 "DBStorage is only used with HBNB_TYPE_STORAGE=db")
+class DBStorageTestCase(unittest.TestCase):
+    """Base class of the DBStorage tests, with a query count helper."""
+
+    @contextmanager
+    def assertQueries(self, count, storage=None):
+        """Asserts that the with block sends count statements."""
+        with (storage or models.storage).count_queries() as statements:
+            yield statements
+        self.assertEqual(count, len(statements), "\n".join(statements))
+
+    def new_storage(self, **env):
+        """Returns a new DBStorage built with the given variables."""
+        from models.engine.db_storage import DBStorage
+        with patch.dict(os.environ, env):
+            os.environ.pop("HBNB_ENV", None)
+            storage = DBStorage()
+        engine = storage._DBStorage__engine
+        self.addCleanup(engine.dispose)
+        return storage, engine
+
+
+class TestDBStorage_load(DBStorageTestCase):
+    """Unittests for the eager loading of relationships."""
+
+    def setUp(self):
+        self.user = User(email="a@b.c", password="pwd", first_name="A")
+        self.wifi = Amenity(name="Wifi")
+        self.objs = [self.user, self.wifi]
+        for i in range(3):
+            st = State(name="State{}".format(i))
+            self.objs.append(st)
+            for j in range(2):
+                cy = City(name="City{}".format(j), state_id=st.id)
+                pl = Place(name="Place{}{}".format(i, j), city_id=cy.id,
+                           user_id=self.user.id)
+                pl.amenities.append(self.wifi)
+                self.objs += [cy, pl,
+                              Review(text="ok", place_id=pl.id,
+                                     user_id=self.user.id)]
+        for obj in self.objs:
+            models.storage.new(obj)
+        models.storage.save()
+        models.storage.close()
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage.delete_many(State, [obj.id for obj in self.objs
+                                           if type(obj) is State])
+        models.storage.delete_many(User, [self.user.id])
+        models.storage.delete_many(Amenity, [self.wifi.id])
+        models.storage.save()
+        models.storage.close()
+
+    def touch(self, places):
+        for pl in places:
+            pl.user.first_name
+            [review.user.first_name for review in pl.reviews]
+            [amenity.name for amenity in pl.amenities]
+
+    def test_lazy_loads_per_object(self):
+        with self.assertQueries(1):
+            places = models.storage.query(Place)
+        with models.storage.count_queries() as statements:
+            self.touch(places)
+        self.assertGreater(len(statements), len(places))
+
+    def test_profile(self):
+        with self.assertQueries(3):
+            places = models.storage.query(Place, load="hbnb")
+            self.touch(places)
+        self.assertEqual(6, len(places))
+        with self.assertQueries(2):
+            states = models.storage.all(State, load="hbnb")
+            for st in states.values():
+                self.assertEqual(2, len(st.cities))
+
+    def test_paths(self):
+        with self.assertQueries(2):
+            places = models.storage.query(
+                "Place", load=["reviews.user"], order_by="name")
+            for pl in places:
+                self.assertEqual(["A"], [rv.user.first_name
+                                         for rv in pl.reviews])
+        self.assertEqual("Place00", places[0].name)
+
+    def test_unknown_profile(self):
+        with self.assertRaises(KeyError):
+            models.storage.query(Place, load="nope")
+
+
+class TestDBStorage_all(DBStorageTestCase):
+    """Unittests for the per-class and single-statement modes of all()."""
+
+    def setUp(self):
+        self.user = User(email="a@b.c", password="pwd", first_name="A")
+        self.state = State(name="California")
+        self.city = City(name="Fremont", state_id=self.state.id)
+        self.place = Place(name="Loft", city_id=self.city.id,
+                           user_id=self.user.id, latitude=37.55,
+                           longitude=-121.98, price_by_night=120)
+        self.wifi = Amenity(name="Wifi")
+        self.place.amenities.append(self.wifi)
+        self.review = Review(text="ok", place_id=self.place.id,
+                             user_id=self.user.id)
+        for obj in (self.user, self.state, self.city, self.place, self.wifi,
+                    self.review):
+            models.storage.new(obj)
+        models.storage.save()
+        models.storage.close()
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage.delete_many(State, [self.state.id])
+        models.storage.delete_many(User, [self.user.id])
+        models.storage.delete_many(Amenity, [self.wifi.id])
+        models.storage.save()
+        models.storage.close()
+
+    def records(self, objects):
+        return {key: obj.to_dict(save_to_disk=True)
+                for key, obj in objects.items()}
+
+    def test_union_matches_per_class(self):
+        per_class, _ = self.new_storage(HBNB_DB_ALL="")
+        union, _ = self.new_storage(HBNB_DB_ALL="union")
+        with self.assertQueries(1, union):
+            objects = union.all()
+        records = self.records(objects)
+        self.assertEqual(self.records(per_class.all()), records)
+        user = records["User." + self.user.id]
+        self.assertEqual("pwd", user["password"])
+        place = records["Place." + self.place.id]
+        self.assertEqual((37.55, -121.98, 120), (
+            place["latitude"], place["longitude"], place["price_by_night"]))
+
+    def test_union_load(self):
+        union, _ = self.new_storage(HBNB_DB_ALL="union")
+        objects = union.all(load="hbnb")
+        place = objects["Place." + self.place.id]
+        state = objects["State." + self.state.id]
+        with self.assertQueries(0, union):
+            self.assertEqual("A", place.user.first_name)
+            self.assertEqual(["A"], [rv.user.first_name
+                                     for rv in place.reviews])
+            self.assertEqual(["Wifi"], [am.name for am in place.amenities])
+            self.assertEqual(["Fremont"], [cy.name for cy in state.cities])
+
+    def test_stats(self):
+        for mode in ("", "union"):
+            storage, _ = self.new_storage(HBNB_DB_ALL=mode)
+            objects = storage.all()
+            stats = storage.stats()["all"]
+            classes = stats["classes"]
+            self.assertEqual(1 if mode else len(classes),
+                             stats["statements"])
+            self.assertEqual(len(objects), sum(timing["rows"]
+                                               for timing in classes.values()))
+            self.assertEqual(1, classes["State"]["rows"])
+            self.assertGreaterEqual(stats["seconds"], sum(
+                timing["seconds"] for timing in classes.values()))
+
+
+class TestDBStorage_delete(DBStorageTestCase):
+    """Unittests for the cascading deletes of delete_many()."""
+
+    def setUp(self):
+        self.users = [User(email="{}@b.c".format(i), password="pwd")
+                      for i in range(2)]
+        self.wifi = Amenity(name="Wifi")
+        self.states = [State(name="State{}".format(i)) for i in range(2)]
+        self.objs = self.users + [self.wifi] + self.states
+        for st in self.states:
+            for j in range(2):
+                cy = City(name="City{}".format(j), state_id=st.id)
+                pl = Place(name="Place{}".format(j), city_id=cy.id,
+                           user_id=self.users[j].id)
+                pl.amenities.append(self.wifi)
+                self.objs += [cy, pl,
+                              Review(text="ok", place_id=pl.id,
+                                     user_id=self.users[1 - j].id)]
+        for obj in self.objs:
+            models.storage.new(obj)
+        models.storage.save()
+        models.storage.close()
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage.delete_many(State, [st.id for st in self.states])
+        models.storage.delete_many(User, [user.id for user in self.users])
+        models.storage.delete_many(Amenity, [self.wifi.id])
+        models.storage.save()
+        models.storage.close()
+
+    def counts(self):
+        from models.place import place_amenity
+        session = models.storage._DBStorage__session
+        counts = [models.storage.count(cls)
+                  for cls in ("City", "Place", "Review")]
+        return counts + [session.query(place_amenity).count()]
+
+    def test_state_subtree(self):
+        before = self.counts()
+        loaded = models.storage.all()
+        self.assertEqual(7, models.storage.delete_many(
+            "State", [self.states[0].id]))
+        session = models.storage._DBStorage__session
+        gone = [obj for obj in loaded.values() if obj not in session]
+        self.assertEqual(7, len(gone))
+        self.assertIn(self.states[0].id, [obj.id for obj in gone])
+        models.storage.save()
+        self.assertEqual([before[0] - 2, before[1] - 2, before[2] - 2,
+                          before[3] - 2], self.counts())
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(gone, [obj for obj in loaded.values()
+                                if obj not in session])
+
+    def test_user_subtree(self):
+        before = self.counts()
+        self.assertEqual(7, models.storage.delete_many(
+            User, [self.users[0].id]))
+        models.storage.save()
+        self.assertEqual([before[0], before[1] - 2, before[2] - 4,
+                          before[3] - 2], self.counts())
+
+
+class TestDBStorage_new_many(DBStorageTestCase):
+    """Unittests for the bulk inserts of new_many() and the loader."""
+
+    def setUp(self):
+        self.state = State(name="Oregon")
+        self.cities = [City(name="City{}".format(i), state_id=self.state.id)
+                       for i in range(3)]
+        self.user = User(email="a@b.c", password="pwd")
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage.delete_many(State, [self.state.id])
+        models.storage.delete_many(User, [self.user.id])
+        models.storage.save()
+        models.storage.close()
+
+    def test_new_many(self):
+        with self.assertQueries(3):
+            self.assertEqual(5, models.storage.new_many(
+                [self.state, self.user] + self.cities))
+        session = models.storage._DBStorage__session
+        self.assertNotIn(self.state, session)
+        models.storage.save()
+        self.assertEqual(5, models.storage.stats()["saved"])
+        models.storage.close()
+        state = models.storage.get("State", self.state.id)
+        self.assertEqual(sorted(cy.name for cy in self.cities),
+                         sorted(cy.name for cy in state.cities))
+        self.assertEqual("pwd", models.storage.get("User", self.user.id)
+                         .password)
+
+    def test_loader(self):
+        rows = [obj.to_dict(save_to_disk=True)
+                for obj in [self.state] + self.cities]
+        rows.insert(2, {"__class__": "Nope"})
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as f:
+            f.write("".join(json.dumps(row) + "\n" for row in rows))
+            f.flush()
+            with patch("sys.stderr", new=StringIO()) as output:
+                self.assertEqual((4, 1), loader.load([f.name], chunk_size=2))
+        self.assertIn(":3: skipped: unknown class 'Nope'", output.getvalue())
+        models.storage.close()
+        self.assertEqual(3, len(models.storage.query(
+            "City", state_id=self.state.id)))
+
+
+class TestDBStorage_pool(DBStorageTestCase):
+    """Unittests for the connection pool settings and metrics."""
+
+    def test_settings(self):
+        storage, engine = self.new_storage(
+            HBNB_MYSQL_POOL_SIZE="3", HBNB_MYSQL_MAX_OVERFLOW="2",
+            HBNB_MYSQL_POOL_RECYCLE="60", HBNB_MYSQL_POOL_TIMEOUT="4.5",
+            HBNB_MYSQL_POOL_PRE_PING="1")
+        self.assertEqual(3, engine.pool.size())
+        self.assertEqual(2, engine.pool._max_overflow)
+        self.assertEqual(60, engine.pool._recycle)
+        self.assertEqual(4.5, engine.pool._timeout)
+        self.assertTrue(engine.pool._pre_ping)
+
+    def test_metrics(self):
+        storage, engine = self.new_storage(
+            HBNB_MYSQL_POOL_SIZE="1", HBNB_MYSQL_MAX_OVERFLOW="0",
+            HBNB_MYSQL_POOL_TIMEOUT="0.1")
+        conn = engine.connect()
+        with self.assertRaises(TimeoutError):
+            engine.connect()
+        pool = storage.stats()["pool"]
+        self.assertEqual((1, 1, 0, 1), (pool["checkouts"], pool["timeouts"],
+                                        pool["checkins"], pool["checked_out"]))
+        conn.close()
+        engine.connect().close()
+        pool = storage.stats()["pool"]
+        self.assertEqual((2, 2, 1), (pool["checkouts"], pool["checkins"],
+                                     pool["checked_in"]))
+        self.assertGreaterEqual(pool["wait_seconds"],
+                                pool["max_wait_seconds"])
+
+    def test_metrics_survive_dispose(self):
+        storage, engine = self.new_storage()
+        engine.connect().close()
+        engine.dispose()
+        self.assertEqual(1, storage.stats()["pool"]["checkouts"])
+
+
+class TestDBStorage_get(DBStorageTestCase):
+    """Unittests for the primary key lookups of get()."""
+
+    def setUp(self):
+        self.user = User(email="a@b.c", password="pwd", first_name="A")
+        models.storage.new(self.user)
+        models.storage.save()
+        models.storage.close()
+
+    def tearDown(self):
+        models.storage.close()
+        models.storage.delete_many(User, [self.user.id])
+        models.storage.save()
+        models.storage.close()
+
+    def test_identity_map(self):
+        with self.assertQueries(1):
+            first = models.storage.get("User", self.user.id)
+            self.assertIs(first, models.storage.get("User", self.user.id))
+        self.assertIsNone(models.storage.get("User", "nope"))
+        self.assertIsNone(models.storage.get("Nope", self.user.id))
+
+    def test_cache(self):
+        storage, engine = self.new_storage(HBNB_DB_CACHE="10")
+        with self.assertQueries(1, storage):
+            storage.get("User", self.user.id)
+        storage.close()
+        with self.assertQueries(0, storage):
+            user = storage.get("User", self.user.id)
+            self.assertEqual("A", user.first_name)
+            self.assertEqual("pwd", user.password)
+        self.assertEqual([], user.places)
+        user.first_name = "B"
+        storage.save()
+        storage.close()
+        with self.assertQueries(1, storage):
+            self.assertEqual("B", storage.get("User", self.user.id)
+                             .first_name)
+
+    def test_cache_invalidated_by_delete(self):
+        storage, engine = self.new_storage(HBNB_DB_CACHE="10")
+        storage.get("User", self.user.id)
+        storage.delete_many("User", [self.user.id])
+        storage.save()
+        storage.close()
+        self.assertIsNone(storage.get("User", self.user.id))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,13 +4,34 @@
 Unittest classes:
     TestFileStorageInstantiation
     TestFileStorageMethods
+    TestFileStorage_journal
+    TestFileStorage_compact
+    TestFileStorage_class_index
+    TestFileStorage_relations
+    TestFileStorage_dirty
+    TestFileStorage_lazy
+    TestFileStorage_compact_objects
+    TestFileStorage_binary
+    TestFileStorage_mmap
+    TestFileStorage_close
+    TestFileStorage_incremental
+    TestFileStorage_sync
+    TestFileStorage_delete_many
+    TestFileStorage_new_many
+    TestFileStorage_query
 """
 import os
+import sys
 import json
+import fcntl
+import subprocess
 import models
 import unittest
 from datetime import datetime
+from time import sleep
+from unittest.mock import patch
 from models.base_model import BaseModel
+from models.engine import serializers
 from models.engine.file_storage import FileStorage
 from models.user import User
 from models.state import State
@@ -172,5 +193,1183 @@ class TestFileStorage_methods(unittest.TestCase):
             models.storage.reload(None)
 
 
+class TestFileStorage_journal(unittest.TestCase):
+    """Unittests for the append-only journal mode of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__dirty.clear()
+        for path in ("file.json", "file.json.log", "file.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def read_journal(self):
+        with open("file.json.log", "r") as f:
+            return [json.loads(line) for line in f]
+
+    def test_save_appends_only_changed_records(self):
+        st = State()
+        cy = City()
+        models.storage.new(st)
+        models.storage.new(cy)
+        models.storage.save()
+        cy.name = "Fremont"
+        models.storage.new(cy)
+        models.storage.save()
+        entries = self.read_journal()
+        self.assertEqual(3, len(entries))
+        self.assertEqual("City." + cy.id, entries[-1]["key"])
+        self.assertEqual("Fremont", entries[-1]["value"]["name"])
+        self.assertFalse(os.path.exists("file.json"))
+
+    def test_save_without_changes_writes_nothing(self):
+        models.storage.new(State())
+        models.storage.save()
+        models.storage.save()
+        self.assertEqual(1, len(self.read_journal()))
+
+    def test_delete_is_journaled(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        models.storage.delete(st)
+        models.storage.save()
+        entries = self.read_journal()
+        self.assertEqual({"key": "State." + st.id, "value": None},
+                         entries[-1])
+
+    def test_reload_replays_journal_over_snapshot(self):
+        st = State(name="California")
+        gone = State(name="Nevada")
+        with open("file.json", "w") as f:
+            json.dump({"State." + st.id: st.to_dict(),
+                       "State." + gone.id: gone.to_dict()}, f)
+        models.storage.reload()
+        kept = models.storage.all()["State." + st.id]
+        kept.name = "Oregon"
+        models.storage.new(kept)
+        models.storage.delete(models.storage.all()["State." + gone.id])
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual("Oregon", objs["State." + st.id].name)
+        self.assertNotIn("State." + gone.id, objs)
+
+    def test_reload_ignores_torn_last_line(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"key": "State.x", "val')
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["State." + st.id], list(models.storage.all()))
+
+    def test_append_after_torn_tail(self):
+        st = State(name="A")
+        models.storage.new(st)
+        models.storage.save()
+        with open("file.json.log", "a") as f:
+            f.write('{"key": "State.x", "val')
+        later = [State(name="B"), State(name="C")]
+        for obj in later:
+            models.storage.new(obj)
+            models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual({"State." + obj.id for obj in [st] + later},
+                         set(models.storage.all()))
+        with open("file.json.log", "r") as f:
+            self.assertEqual(3, len(f.readlines()))
+
+    def test_reload_reads_record_glued_to_torn_line(self):
+        st = State()
+        with open("file.json.log", "w") as f:
+            f.write('{"key": "State.x", "val' + json.dumps(
+                {"key": "State." + st.id,
+                 "value": st.to_dict(save_to_disk=True)}) + "\n")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(["State." + st.id], list(models.storage.all()))
+
+    def test_full_save_discards_journal(self):
+        models.storage.new(State())
+        models.storage.save()
+        FileStorage._FileStorage__journal = False
+        models.storage.save()
+        self.assertFalse(os.path.exists("file.json.log"))
+        self.assertTrue(os.path.exists("file.json"))
+
+
+class TestFileStorage_compact(unittest.TestCase):
+    """Unittests for folding the FileStorage journal into a snapshot."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        models.storage.wait_compaction()
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__max_records = 10000
+        FileStorage._FileStorage__dirty.clear()
+        for path in ("file.json", "file.json.log",
+                     "file.json.log.compacting", "file.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_compact_folds_journal_into_snapshot(self):
+        st = State(name="California")
+        gone = State()
+        models.storage.new(st)
+        models.storage.new(gone)
+        models.storage.save()
+        models.storage.delete(gone)
+        models.storage.save()
+        models.storage.compact()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json", "r") as f:
+            snapshot = json.load(f)
+        self.assertEqual(["State." + st.id], list(snapshot))
+        self.assertEqual("California", snapshot["State." + st.id]["name"])
+
+    def test_compact_keeps_later_appends(self):
+        first = State()
+        models.storage.new(first)
+        models.storage.save()
+        models.storage.compact()
+        second = State()
+        models.storage.new(second)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("State." + first.id, models.storage.all())
+        self.assertIn("State." + second.id, models.storage.all())
+
+    def test_reload_replays_interrupted_compaction(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        os.rename("file.json.log", "file.json.log.compacting")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("State." + st.id, models.storage.all())
+
+    def test_record_threshold_triggers_compaction(self):
+        FileStorage._FileStorage__max_records = 3
+        for _ in range(3):
+            models.storage.new(State())
+            models.storage.save()
+        models.storage.wait_compaction()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+
+    def test_reload_does_not_compact(self):
+        for _ in range(3):
+            models.storage.new(State())
+            models.storage.save()
+        FileStorage._FileStorage__max_records = 3
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        models.storage.wait_compaction()
+        self.assertTrue(os.path.exists("file.json.log"))
+
+    def test_compaction_waits_for_lock(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        with open("file.json.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            models.storage.compact(wait=False)
+            sleep(0.1)
+            self.assertTrue(os.path.exists("file.json.log"))
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        models.storage.wait_compaction()
+        self.assertFalse(os.path.exists("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertIn("State." + st.id, json.load(f))
+
+    def test_concurrent_appends_and_compactions(self):
+        script = ("import models\n"
+                  "from models.amenity import Amenity\n"
+                  "for _ in range(100):\n"
+                  "    Amenity().save()\n"
+                  "models.storage.wait_compaction()\n")
+        env = dict(os.environ, HBNB_FILE_JOURNAL="1", HBNB_FILE_SYNC="none",
+                   HBNB_JOURNAL_MAX_RECORDS="1",
+                   PYTHONPATH=os.path.abspath(
+                       os.path.dirname(models.__path__[0])))
+        workers = [subprocess.Popen([sys.executable, "-c", script], env=env)
+                   for _ in range(6)]
+        for worker in workers:
+            self.assertEqual(0, worker.wait())
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(600, models.storage.count("Amenity"))
+
+    def test_compaction_leaves_no_temporary_file(self):
+        models.storage.new(State())
+        models.storage.save()
+        models.storage.compact()
+        self.assertEqual(["file.json", "file.json.lock"],
+                         sorted(name for name in os.listdir(".")
+                                if name.startswith("file.json")))
+
+    def test_console_compact(self):
+        from console import HBNBCommand
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        self.assertFalse(HBNBCommand().onecmd("compact"))
+        with open("file.json", "r") as f:
+            self.assertIn("State." + st.id, json.load(f))
+
+
+class TestFileStorage_class_index(unittest.TestCase):
+    """Unittests for the per-class index behind all(cls) and count(cls)."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_all_cls_follows_new_and_delete(self):
+        st = State()
+        cy = City()
+        models.storage.new(st)
+        models.storage.new(cy)
+        self.assertEqual({"State." + st.id: st}, models.storage.all("State"))
+        self.assertEqual({"City." + cy.id: cy}, models.storage.all(City))
+        models.storage.delete(st)
+        self.assertEqual({}, models.storage.all(State))
+        self.assertEqual(0, models.storage.count("State"))
+        self.assertEqual(1, models.storage.count("City"))
+
+    def test_all_cls_returns_a_copy(self):
+        models.storage.new(State())
+        models.storage.all("State").clear()
+        self.assertEqual(1, models.storage.count("State"))
+
+    def test_index_follows_reload(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count("State"))
+        models.storage.reload()
+        self.assertIn("State." + st.id, models.storage.all(State))
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(0, models.storage.count("City"))
+
+
+class TestFileStorage_relations(unittest.TestCase):
+    """Unittests for the foreign key indexes behind relationship getters."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_state_cities_follows_new_and_delete(self):
+        st = State()
+        cy = City(state_id=st.id)
+        other = City(state_id="elsewhere")
+        models.storage.new(st)
+        models.storage.new(cy)
+        models.storage.new(other)
+        self.assertEqual([cy], st.cities)
+        models.storage.delete(cy)
+        self.assertEqual([], st.cities)
+
+    def test_state_cities_follows_attribute_update(self):
+        st = State()
+        cy = City()
+        models.storage.new(st)
+        models.storage.new(cy)
+        self.assertEqual([], st.cities)
+        cy.state_id = st.id
+        self.assertEqual([cy], st.cities)
+        cy.state_id = "elsewhere"
+        self.assertEqual([], st.cities)
+
+    def test_place_reviews_and_amenities(self):
+        pl = Place()
+        rv = Review(place_id=pl.id)
+        am = Amenity(place_id=pl.id)
+        for obj in (pl, rv, am, Review(), Amenity()):
+            models.storage.new(obj)
+        self.assertEqual([rv], pl.reviews)
+        self.assertEqual([am], pl.amenities)
+
+    def test_index_rebuilt_after_objects_replaced(self):
+        st = State()
+        cy = City(state_id=st.id)
+        models.storage.new(cy)
+        FileStorage._FileStorage__objects = {"City." + cy.id: cy}
+        self.assertEqual([cy], st.cities)
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual([], st.cities)
+
+    def test_index_built_on_first_lookup(self):
+        st = State()
+        cy = City(state_id=st.id)
+        models.storage.new(st)
+        models.storage.new(cy)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual({}, FileStorage._FileStorage__by_fk)
+        self.assertEqual([cy.id], [city.id for city in st.cities])
+        self.assertEqual({("City", "state_id")},
+                         set(FileStorage._FileStorage__by_fk))
+        self.assertEqual(["City." + cy.id],
+                         list(FileStorage._FileStorage__fk_of))
+        models.storage.new(City(state_id=st.id))
+        self.assertEqual(2, len(st.cities))
+
+    def test_related_unindexed_attribute(self):
+        pl = Place(user_id="123")
+        models.storage.new(pl)
+        self.assertEqual([pl], models.storage.related(Place, "user_id", "123"))
+
+
+class TestFileStorage_dirty(unittest.TestCase):
+    """Unittests for saving only the objects changed since the last save."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_counts_only_dirty_objects(self):
+        st = State()
+        cy = City()
+        models.storage.new(st)
+        models.storage.new(cy)
+        models.storage.save()
+        self.assertEqual(2, models.storage.stats()["saved"])
+        models.storage.save()
+        self.assertEqual(0, models.storage.stats()["saved"])
+        st.name = "Texas"
+        models.storage.save()
+        self.assertEqual(1, models.storage.stats()["saved"])
+
+    def test_clean_objects_do_not_keep_their_record(self):
+        st = State(name="Texas")
+        models.storage.new(st)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        saved = FileStorage._FileStorage__saved
+        self.assertEqual({None}, set(saved.values()))
+        models.storage.new(City())
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual("Texas", json.load(f)["State." + st.id]["name"])
+
+    def test_clean_objects_are_serialized_once(self):
+        states = [State(name=str(i)) for i in range(3)]
+        for st in states:
+            models.storage.new(st)
+        models.storage.save()
+        models.storage.new(City())
+        models.storage.save()
+        states[0].name = "Ohio"
+        with patch.object(State, "to_dict", autospec=True,
+                          side_effect=State.to_dict) as to_dict:
+            models.storage.save()
+        to_dict.assert_called_once_with(states[0], save_to_disk=True)
+        with open("file.json", "r") as f:
+            records = json.load(f)
+        self.assertEqual(["Ohio", "1", "2"],
+                         [records["State." + st.id]["name"] for st in states])
+
+    def test_only_stored_objects_report_assignments(self):
+        st = State()
+        with patch.object(models.storage, "touch") as touch:
+            st.name = "Ohio"
+            touch.assert_not_called()
+            models.storage.new(st)
+            st.name = "Iowa"
+            touch.assert_called_once_with(st, "name")
+        self.assertNotIn("_stored", st.to_dict())
+        self.assertNotIn("_stored", str(st))
+
+    def test_attribute_assignment_is_persisted(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        st.name = "Utah"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual("Utah", json.load(f)["State." + st.id]["name"])
+
+    def test_reloaded_objects_are_clean(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        models.storage.save()
+        self.assertEqual(0, models.storage.stats()["saved"])
+
+    def test_delete_is_saved(self):
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        models.storage.delete(st)
+        models.storage.save()
+        self.assertEqual(1, models.storage.stats()["saved"])
+        with open("file.json", "r") as f:
+            self.assertEqual({}, json.load(f))
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """Unittests for building objects on first access after reload."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Nevada")
+        self.cy = City(state_id=self.st.id)
+        self.am = Amenity()
+        for obj in (self.st, self.cy, self.am):
+            models.storage.new(obj)
+        models.storage.save()
+        FileStorage._FileStorage__lazy = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def objects(self):
+        return FileStorage._FileStorage__objects
+
+    def test_reload_builds_nothing(self):
+        self.assertEqual({}, self.objects())
+        self.assertEqual(1, models.storage.count("State"))
+        self.assertEqual(3, models.storage.count())
+
+    def test_get_builds_and_caches_one_object(self):
+        st = models.storage.get("State", self.st.id)
+        self.assertEqual("Nevada", st.name)
+        self.assertEqual(["State." + self.st.id], list(self.objects()))
+        self.assertIs(st, models.storage.get("State", self.st.id))
+        self.assertIsNone(models.storage.get("State", "missing"))
+
+    def test_all_cls_builds_only_that_class(self):
+        cities = models.storage.all("City")
+        self.assertEqual(["City." + self.cy.id], list(cities))
+        self.assertEqual(["City." + self.cy.id], list(self.objects()))
+
+    def test_relationship_builds_related_objects(self):
+        st = models.storage.get("State", self.st.id)
+        self.assertEqual([self.cy.id], [cy.id for cy in st.cities])
+        self.assertNotIn("Amenity." + self.am.id, self.objects())
+
+    def test_all_builds_everything(self):
+        self.assertEqual(3, len(models.storage.all()))
+
+    def test_save_keeps_unbuilt_records(self):
+        st = models.storage.get("State", self.st.id)
+        st.name = "Oregon"
+        models.storage.save()
+        self.assertEqual(1, models.storage.stats()["saved"])
+        with open("file.json", "r") as f:
+            records = json.load(f)
+        self.assertEqual(3, len(records))
+        self.assertEqual("Oregon", records["State." + self.st.id]["name"])
+
+
+class TestFileStorage_compact_objects(unittest.TestCase):
+    """Unittests for the compact in-memory representation of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Nevada")
+        self.cities = [City(state_id=self.st.id) for _ in range(2)]
+        for obj in [self.st] + self.cities:
+            models.storage.new(obj)
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.records = json.load(f)
+        FileStorage._FileStorage__compact = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__compact = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_to_dict_unchanged(self):
+        for key, obj in models.storage.all().items():
+            self.assertEqual(self.records[key], obj.to_dict(save_to_disk=True))
+
+    def test_records_released(self):
+        saved = FileStorage._FileStorage__saved
+        self.assertEqual({None}, set(saved.values()))
+
+    def test_foreign_keys_shared(self):
+        first, second = models.storage.all(City).values()
+        self.assertIs(first.state_id, second.state_id)
+
+    def test_foreign_keys_indexed_on_demand(self):
+        indexed = FileStorage._FileStorage__fk_indexed
+        self.assertNotIn("City", indexed)
+        st = models.storage.get("State", self.st.id)
+        self.assertEqual({cy.id for cy in self.cities},
+                         {cy.id for cy in st.cities})
+        self.assertIn("City", indexed)
+        cy = City(state_id=st.id)
+        models.storage.new(cy)
+        self.assertEqual(3, len(st.cities))
+
+    def test_city_shares_state_id_string(self):
+        st = models.storage.get("State", self.st.id)
+        for cy in models.storage.all(City).values():
+            self.assertIs(st.id, cy.state_id)
+
+    def test_full_save_rewrites_clean_objects(self):
+        cy = models.storage.get("City", self.cities[0].id)
+        cy.name = "Reno"
+        models.storage.save()
+        self.assertEqual(1, models.storage.stats()["saved"])
+        self.records["City." + cy.id] = cy.to_dict(save_to_disk=True)
+        with open("file.json", "r") as f:
+            self.assertEqual(self.records, json.load(f))
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """Unittests for the binary file format of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Utah")
+        self.cy = City(state_id=self.st.id, name="Provo")
+        for obj in (self.st, self.cy):
+            models.storage.new(obj)
+        FileStorage._FileStorage__format = "binary"
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = "json"
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_file_is_binary(self):
+        with open("file.json", "rb") as f:
+            self.assertEqual(serializers.magic,
+                             f.read(len(serializers.magic)))
+
+    def test_reload(self):
+        records = {key: obj.to_dict(save_to_disk=True)
+                   for key, obj in models.storage.all().items()}
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(records, {key: obj.to_dict(save_to_disk=True)
+                                   for key, obj in
+                                   models.storage.all().items()})
+        self.assertEqual([models.storage.get("City", self.cy.id)],
+                         self.st.cities)
+
+    def test_switch_back_to_json(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        FileStorage._FileStorage__format = "json"
+        models.storage.new(State(name="Idaho"))
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(3, len(json.load(f)))
+
+
+class TestFileStorage_mmap(unittest.TestCase):
+    """Unittests for the memory-mapped snapshot of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Iowa")
+        self.cities = [City(state_id=self.st.id, name="Ames")
+                       for _ in range(2)]
+        for obj in [self.st] + self.cities:
+            models.storage.new(obj)
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__mmap = True
+        models.storage.save()
+        self.records = {key: obj.to_dict(save_to_disk=True)
+                        for key, obj in models.storage.all().items()}
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__mmap = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_nothing_decoded(self):
+        self.assertEqual({}, FileStorage._FileStorage__objects)
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(2, models.storage.count("City"))
+
+    def test_get_decodes_one_record(self):
+        cy = models.storage.get("City", self.cities[0].id)
+        self.assertEqual(self.records["City." + cy.id],
+                         cy.to_dict(save_to_disk=True))
+        self.assertEqual(1, len(FileStorage._FileStorage__objects))
+
+    def test_related(self):
+        st = models.storage.get("State", self.st.id)
+        self.assertEqual({cy.id for cy in self.cities},
+                         {cy.id for cy in st.cities})
+
+    def test_save_keeps_undecoded_records(self):
+        st = models.storage.get("State", self.st.id)
+        st.name = "Ohio"
+        models.storage.save()
+        self.records["State." + st.id] = st.to_dict(save_to_disk=True)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(self.records,
+                         {key: obj.to_dict(save_to_disk=True)
+                          for key, obj in models.storage.all().items()})
+
+    def test_json_snapshot_falls_back(self):
+        FileStorage._FileStorage__format = "json"
+        models.storage.all()
+        models.storage.new(State(name="Utah"))
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertEqual(4, len(FileStorage._FileStorage__objects))
+
+
+class TestFileStorage_close(unittest.TestCase):
+    """Unittests for the change check of FileStorage.close()."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Kansas")
+        models.storage.new(self.st)
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        for path in ("file.json.log", "file.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_unchanged_file_not_reloaded(self):
+        models.storage.close()
+        self.assertIs(self.st, models.storage.get("State", self.st.id))
+
+    def test_own_journal_append_not_reloaded(self):
+        FileStorage._FileStorage__journal = True
+        self.st.name = "Kentucky"
+        models.storage.save()
+        models.storage.close()
+        self.assertIs(self.st, models.storage.get("State", self.st.id))
+
+    def test_changed_file_reloaded(self):
+        with open("file.json", "r") as f:
+            records = json.load(f)
+        records["State." + self.st.id]["name"] = "Nebraska"
+        with open("file.json", "w") as f:
+            json.dump(records, f)
+        models.storage.close()
+        self.assertEqual("Nebraska", self.st.name)
+
+    def test_replaced_objects_reloaded(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.close()
+        self.assertEqual(1, models.storage.count("State"))
+
+
+class TestFileStorage_incremental(unittest.TestCase):
+    """Unittests for the incremental reload of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State(name="Texas")
+        self.other = State(name="Utah")
+        self.cy = City(state_id=self.st.id, name="Austin")
+        for obj in (self.st, self.other, self.cy):
+            models.storage.new(obj)
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__format = "json"
+        FileStorage._FileStorage__mmap = False
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def rewrite(self, change):
+        """Rewrites the file the way another process would."""
+        records = dict(serializers.load_file("file.json"))
+        change(records)
+        serializers.dump_file(records.items(), "file.json.tmp",
+                              FileStorage._FileStorage__format)
+        os.replace("file.json.tmp", "file.json")
+
+    def test_unchanged_objects_kept(self):
+        self.rewrite(lambda records: None)
+        models.storage.reload()
+        self.assertIs(self.st, models.storage.get("State", self.st.id))
+        self.assertEqual(3, models.storage.count())
+
+    def test_changed_object_updated_in_place(self):
+        def move(records):
+            records["City." + self.cy.id]["state_id"] = self.other.id
+            records["City." + self.cy.id]["name"] = "Provo"
+        self.rewrite(move)
+        models.storage.reload()
+        self.assertIs(self.cy, models.storage.get("City", self.cy.id))
+        self.assertEqual("Provo", self.cy.name)
+        self.assertEqual([], self.st.cities)
+        self.assertEqual([self.cy], self.other.cities)
+        models.storage.save()
+        self.assertEqual(0, models.storage.stats()["saved"])
+
+    def test_removed_clean_objects_dropped(self):
+        st = State(name="Ohio")
+        models.storage.new(st)
+        self.rewrite(lambda records: records.pop("State." + self.other.id))
+        models.storage.reload()
+        self.assertIsNone(models.storage.get("State", self.other.id))
+        self.assertIs(st, models.storage.get("State", st.id))
+
+    def test_mapped_snapshot(self):
+        FileStorage._FileStorage__format = "binary"
+        FileStorage._FileStorage__mmap = True
+        models.storage.new(State(name="Iowa"))
+        models.storage.save()
+        models.storage.reload()
+
+        def rename(records):
+            records["State." + self.st.id]["name"] = "Maine"
+        self.rewrite(rename)
+        models.storage.reload()
+        self.assertIs(self.st, models.storage.get("State", self.st.id))
+        self.assertEqual("Maine", self.st.name)
+        self.assertEqual(3, models.storage.count("State"))
+
+
+class TestFileStorage_sync(unittest.TestCase):
+    """Unittests for the durability modes of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def tearDown(self):
+        models.storage.flush()
+        FileStorage._FileStorage__sync = "always"
+        FileStorage._FileStorage__window = 0.05
+        FileStorage._FileStorage__journal = False
+        for path in ("file.json", "file.json.log", "file.json.lock"):
+            try:
+                os.remove(path)
+            except IOError:
+                pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_always_fsyncs(self):
+        with patch("os.fsync") as fsync:
+            models.storage.new(State())
+            models.storage.save()
+        self.assertEqual(2, fsync.call_count)
+
+    def test_none_skips_fsync(self):
+        FileStorage._FileStorage__sync = "none"
+        with patch("os.fsync") as fsync:
+            models.storage.new(State())
+            models.storage.save()
+        self.assertEqual(0, fsync.call_count)
+        self.assertTrue(os.path.exists("file.json"))
+
+    def test_batch_coalesces_saves(self):
+        FileStorage._FileStorage__sync = "batch"
+        FileStorage._FileStorage__window = 60
+        writes = models.storage.stats()["writes"]
+        for _ in range(5):
+            models.storage.new(State())
+            models.storage.save()
+        self.assertFalse(os.path.exists("file.json"))
+        models.storage.flush()
+        self.assertEqual(writes + 1, models.storage.stats()["writes"])
+        with open("file.json", "r") as f:
+            self.assertEqual(5, len(json.load(f)))
+
+    def test_batch_journal(self):
+        FileStorage._FileStorage__sync = "batch"
+        FileStorage._FileStorage__window = 60
+        FileStorage._FileStorage__journal = True
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        st.name = "Maine"
+        models.storage.save()
+        models.storage.flush()
+        with open("file.json.log", "r") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual(1, len(entries))
+        self.assertEqual("Maine", entries[0]["value"]["name"])
+
+    def test_batch_window_flushes(self):
+        FileStorage._FileStorage__sync = "batch"
+        FileStorage._FileStorage__window = 0.01
+        models.storage.new(State())
+        models.storage.save()
+        sleep(0.2)
+        self.assertTrue(os.path.exists("file.json"))
+
+    def test_batch_flush_after_unsaved_delete(self):
+        FileStorage._FileStorage__sync = "batch"
+        FileStorage._FileStorage__window = 60
+        first, second = State(name="A"), State(name="B")
+        models.storage.new(first)
+        models.storage.save()
+        models.storage.flush()
+        models.storage.new(second)
+        models.storage.save()
+        models.storage.delete(first)
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertEqual(["State." + second.id], list(json.load(f)))
+        models.storage.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertEqual(["State." + second.id], list(json.load(f)))
+
+    def test_reload_flushes_first(self):
+        FileStorage._FileStorage__sync = "batch"
+        FileStorage._FileStorage__window = 60
+        st = State()
+        models.storage.new(st)
+        models.storage.save()
+        models.storage.reload()
+        self.assertIs(st, models.storage.get("State", st.id))
+
+
+class TestFileStorage_delete_many(unittest.TestCase):
+    """Unittests for the bulk and cascading deletes of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.user = User(email="a@b.c")
+        self.st = State(name="Texas")
+        self.other = State(name="Utah")
+        self.cy = City(state_id=self.st.id)
+        self.kept_cy = City(state_id=self.other.id)
+        self.pl = Place(city_id=self.cy.id, user_id=self.user.id)
+        self.kept_pl = Place(city_id=self.kept_cy.id, user_id=self.user.id)
+        self.rv = Review(place_id=self.pl.id, user_id=self.user.id)
+        self.kept_rv = Review(place_id=self.kept_pl.id, user_id=self.user.id)
+        for obj in (self.user, self.st, self.other, self.cy, self.kept_cy,
+                    self.pl, self.kept_pl, self.rv, self.kept_rv):
+            models.storage.new(obj)
+        models.storage.save()
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def keys(self, *objs):
+        return {"{}.{}".format(type(obj).__name__, obj.id) for obj in objs}
+
+    def test_cascades_down_the_tree(self):
+        self.assertEqual(4, models.storage.delete_many(State, [self.st.id]))
+        self.assertEqual(self.keys(self.user, self.other, self.kept_cy,
+                                   self.kept_pl, self.kept_rv),
+                         set(models.storage.all()))
+        self.assertEqual([], self.st.cities)
+
+    def test_one_write(self):
+        writes = models.storage.stats()["writes"]
+        models.storage.delete_many("State", [self.st.id, self.other.id])
+        models.storage.save()
+        self.assertEqual(writes + 1, models.storage.stats()["writes"])
+        with open("file.json", "r") as f:
+            self.assertEqual(self.keys(self.user), set(json.load(f)))
+
+    def test_predicate(self):
+        deleted = models.storage.delete_many(
+            "State", lambda st: st.name == "Utah")
+        self.assertEqual(4, deleted)
+        self.assertIsNone(models.storage.get("Review", self.kept_rv.id))
+        self.assertIs(self.rv, models.storage.get("Review", self.rv.id))
+
+    def test_unknown_ids_ignored(self):
+        self.assertEqual(0, models.storage.delete_many("City", ["nope"]))
+        self.assertEqual(9, models.storage.count())
+
+    def test_delete_cascades(self):
+        models.storage.delete(self.user)
+        self.assertEqual(self.keys(self.st, self.other, self.cy,
+                                   self.kept_cy),
+                         set(models.storage.all()))
+
+
+class TestFileStorage_new_many(unittest.TestCase):
+    """Unittests for the bulk insert of FileStorage."""
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.st = State.from_dict({"name": "Texas"})
+        self.cities = [City.from_dict({"name": str(i), "state_id": self.st.id})
+                       for i in range(3)]
+
+    def tearDown(self):
+        try:
+            os.remove("file.json")
+        except IOError:
+            pass
+        try:
+            os.rename("tmp", "file.json")
+        except IOError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_indexes_all(self):
+        objs = [self.st] + self.cities
+        self.assertEqual(4, models.storage.new_many(iter(objs)))
+        self.assertEqual(objs, list(models.storage.all().values()))
+        self.assertEqual(3, models.storage.count("City"))
+        self.assertEqual(self.cities, self.st.cities)
+
+    def test_one_write(self):
+        writes = models.storage.stats()["writes"]
+        models.storage.new_many([self.st] + self.cities)
+        self.assertEqual(writes, models.storage.stats()["writes"])
+        models.storage.save()
+        self.assertEqual(writes + 1, models.storage.stats()["writes"])
+        with open("file.json", "r") as f:
+            self.assertEqual(4, len(json.load(f)))
+
+    def test_replaces_same_key(self):
+        models.storage.new_many(self.cities)
+        moved = City.from_dict(self.cities[0].to_dict())
+        moved.state_id = "other"
+        models.storage.new_many([moved])
+        self.assertEqual(3, models.storage.count("City"))
+        self.assertIs(moved, models.storage.get("City", moved.id))
+        self.assertEqual(self.cities[1:], models.storage.related(
+            "City", "state_id", self.st.id))
+
+    def test_empty(self):
+        self.assertEqual(0, models.storage.new_many([]))
+
+
+class TestFileStorage_query(unittest.TestCase):
+    """Unittests for the filtered queries of FileStorage."""
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.places = [Place.from_dict({
+            "name": "p{}".format(i), "city_id": "c{}".format(i % 3),
+            "price_by_night": i * 10, "max_guest": i % 4})
+            for i in range(12)]
+        models.storage.new_many(self.places)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def names(self, objs):
+        return [obj.name for obj in objs]
+
+    def test_no_filters(self):
+        self.assertEqual(self.places, models.storage.query(Place))
+
+    def test_foreign_key_and_range(self):
+        found = models.storage.query("Place", city_id="c1",
+                                     price_by_night__gte=40,
+                                     price_by_night__lt=100)
+        self.assertEqual(["p4", "p7"], self.names(found))
+
+    def test_in_and_ne(self):
+        found = models.storage.query("Place", city_id__in=["c2", "c0"],
+                                     max_guest__ne=0)
+        self.assertEqual(["p2", "p5", "p11", "p3", "p6", "p9"],
+                         self.names(found))
+
+    def test_order_limit_offset(self):
+        found = models.storage.query("Place", order_by=["max_guest", "-name"],
+                                     limit=3, offset=1)
+        self.assertEqual(["p4", "p0", "p9"], self.names(found))
+
+    def test_missing_attribute(self):
+        self.assertEqual([], models.storage.query(
+            "Place", price_by_night__lt=None))
+        self.assertEqual(12, len(models.storage.query("Place", nope=None)))
+
+    def test_unknown_operator(self):
+        with self.assertRaises(ValueError):
+            models.storage.query("Place", max_guest__like=1)
+
+    def test_unknown_class(self):
+        self.assertEqual([], models.storage.query("MyModel"))
+
+
 if __name__ == "__main__":
     unittest.main()
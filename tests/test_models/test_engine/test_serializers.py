@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+"""Defines unittests for models/engine/serializers.py.
+
+Unittest classes:
+    TestLoadJson
+    TestDumpJson
+    TestBinaryFormat
+"""
+import io
+import json
+import os
+import tempfile
+import unittest
+from models.engine.convert import convert
+from models.engine.serializers import BinaryWriter, MappedSnapshot, \
+    dump_binary, dump_file, dump_json, load_binary, load_file, load_json, \
+    magic
+from models.place import Place
+from models.state import State
+
+
+class TestLoadJson(unittest.TestCase):
+    """Unittests for the streaming JSON loader."""
+
+    def setUp(self):
+        objs = [State(name="Cal\u00e9 \"A\""), Place(latitude=1.5)]
+        self.records = {"{}.{}".format(type(o).__name__, o.id):
+                        o.to_dict(save_to_disk=True) for o in objs}
+
+    def test_matches_json_load(self):
+        text = json.dumps(self.records)
+        for chunk_size in (1, 7, 1 << 16):
+            entries = list(load_json(io.StringIO(text), chunk_size))
+            self.assertEqual(list(self.records.items()), entries)
+
+    def test_any_whitespace(self):
+        text = json.dumps(self.records, indent=4, separators=(" ,", " : "))
+        entries = load_json(io.StringIO(text), 5)
+        self.assertEqual(self.records, dict(entries))
+
+    def test_empty_object(self):
+        self.assertEqual([], list(load_json(io.StringIO(" {\n} "))))
+
+    def test_record_keys_are_shared(self):
+        first, second = load_json(io.StringIO(json.dumps(self.records)))
+        self.assertIs(list(first[1])[0], list(second[1])[0])
+
+    def test_invalid_documents(self):
+        for text in ("", "[]", '{"a": 1', '{"a" 1}', '{"a": 1 "b": 2}',
+                     '{"a": 1,}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(load_json(io.StringIO(text), 3))
+
+
+class TestDumpJson(unittest.TestCase):
+    """Unittests for the streaming JSON writer."""
+
+    def dump(self, items):
+        f = io.StringIO()
+        dump_json(items, f)
+        return f.getvalue()
+
+    def test_matches_json_dumps(self):
+        objs = [State(name="Cal\u00e9 \"A\""), Place(latitude=1.5)]
+        records = {"{}.{}".format(type(o).__name__, o.id):
+                   o.to_dict(save_to_disk=True) for o in objs}
+        self.assertEqual(json.dumps(records), self.dump(records.items()))
+
+    def test_empty_object(self):
+        self.assertEqual("{}", self.dump(iter(())))
+
+    def test_round_trip(self):
+        records = {"a": {"b": [1, None]}, "c": "d"}
+        text = self.dump(records.items())
+        self.assertEqual(records, dict(load_json(io.StringIO(text))))
+
+
+class TestBinaryFormat(unittest.TestCase):
+    """Unittests for the binary snapshot format."""
+
+    def setUp(self):
+        objs = [State(name="Cal\u00e9 \"A\""), Place(latitude=1.5)]
+        self.records = {"{}.{}".format(type(o).__name__, o.id):
+                        o.to_dict(save_to_disk=True) for o in objs}
+        self.records["no dot"] = {
+            "__class__": 3, "ints": [0, -1, 2 ** 63, -2 ** 70],
+            "flags": [True, False, None], "nested": {1: "a", "b": [{}]},
+            "text": "\ud800 \U0001f600", "id": "ABCDEF00-0000-0000-0000-"
+            "000000000000", "float": 1e308}
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def dump(self, records):
+        f = io.BytesIO()
+        dump_binary(records.items(), f)
+        return f.getvalue()
+
+    def dump_records(self, records):
+        """Returns the file without its trailing index."""
+        f = io.BytesIO()
+        writer = BinaryWriter(f)
+        for key, record in records.items():
+            writer.write(key, record)
+        return f.getvalue()
+
+    def test_round_trip_is_lossless(self):
+        data = self.dump(self.records)
+        entries = list(load_binary(io.BytesIO(data)))
+        self.assertEqual(list(self.records.items()), entries)
+        self.assertEqual(json.dumps(self.records), json.dumps(dict(entries)))
+
+    def test_smaller_than_json(self):
+        records = {"State." + st.id: st.to_dict(save_to_disk=True)
+                   for st in (State(name="Maine") for _ in range(20))}
+        self.assertLess(len(self.dump_records(records)) * 3,
+                        len(json.dumps(records)) * 2)
+
+    def test_class_names_written_once(self):
+        records = {"State." + str(i): {"__class__": "State"}
+                   for i in range(3)}
+        self.assertEqual(1, self.dump_records(records).count(b"State"))
+
+    def test_uuid_ids_packed(self):
+        key = next(iter(self.records))
+        uuid = key.partition(".")[2]
+        data = self.dump_records(self.records)
+        self.assertNotIn(uuid.encode(), data)
+        self.assertIn(bytes.fromhex(uuid.replace("-", "")), data)
+
+    def test_mapped_index(self):
+        path = os.path.join(self.tmp.name, "a.bin")
+        dump_file(self.records.items(), path, "binary")
+        snapshot = MappedSnapshot(path)
+        self.addCleanup(snapshot.close)
+        entries = [(key, snapshot.record(offset))
+                   for _, keys, offsets in snapshot.groups
+                   for key, offset in zip(keys, offsets)]
+        self.assertEqual(sorted(self.records.items(), key=str),
+                         sorted(entries, key=str))
+        self.assertEqual(["State", "Place", "no dot"],
+                         [group[0] for group in snapshot.groups])
+
+    def test_mapped_needs_index(self):
+        path = os.path.join(self.tmp.name, "a.json")
+        dump_file(self.records.items(), path)
+        with self.assertRaises(ValueError):
+            MappedSnapshot(path)
+
+    def test_truncated_file(self):
+        data = self.dump(self.records)
+        with self.assertRaises(ValueError):
+            list(load_binary(io.BytesIO(data[:-1])))
+        with self.assertRaises(ValueError):
+            list(load_binary(io.BytesIO(b"{}")))
+
+    def test_files_convert_losslessly(self):
+        paths = [os.path.join(self.tmp.name, name)
+                 for name in ("a.json", "b.bin", "c.json")]
+        dump_file(self.records.items(), paths[0])
+        dump_file(load_file(paths[0]), paths[1], "binary")
+        dump_file(load_file(paths[1]), paths[2], "json")
+        with open(paths[0], "rb") as a, open(paths[2], "rb") as c:
+            self.assertEqual(a.read(), c.read())
+
+    def test_convert_in_place(self):
+        path = os.path.join(self.tmp.name, "file.json")
+        dump_file(self.records.items(), path)
+        convert("binary", path, path)
+        with open(path, "rb") as f:
+            self.assertTrue(f.read().startswith(magic))
+        convert("json", path, path)
+        with open(path, "r") as f:
+            self.assertEqual(json.loads(json.dumps(self.records)),
+                             json.load(f))
+        self.assertEqual(["file.json"], os.listdir(self.tmp.name))
+
+    def test_convert_failure_keeps_target(self):
+        source = os.path.join(self.tmp.name, "broken.json")
+        target = os.path.join(self.tmp.name, "file.json")
+        with open(source, "w") as f:
+            f.write('{"State.1": ')
+        dump_file(self.records.items(), target)
+        with open(target, "rb") as f:
+            data = f.read()
+        with self.assertRaises(ValueError):
+            convert("binary", source, target)
+        with open(target, "rb") as f:
+            self.assertEqual(data, f.read())
+        self.assertEqual(["broken.json", "file.json"],
+                         sorted(os.listdir(self.tmp.name)))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            dump_file(iter(()), os.path.join(self.tmp.name, "a"), "xml")
+
+
+if __name__ == "__main__":
+    unittest.main()
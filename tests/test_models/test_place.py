@@ -5,6 +5,7 @@ Unittest classes:
     TestPlace_instantiation
     TestPlace_save
     TestPlace_to_dict
+    TestPlace_user
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.place import Place
+from models.engine.file_storage import FileStorage
+from models.user import User
 
 
 class TestPlace_instantiation(unittest.TestCase):
@@ -257,6 +260,27 @@ class TestPlace_to_dict(unittest.TestCase):
             plac.to_dict(None)
 
 
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "The user relationship is mapped by SQLAlchemy")
+class TestPlace_user(unittest.TestCase):
+    """Unittests for the user attribute of the Place class."""
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        FileStorage._FileStorage__objects = {}
+
+    def test_user_is_the_owner(self):
+        """Test that user returns the User of user_id."""
+        us = User()
+        models.storage.new(us)
+        obj = Place(user_id=us.id)
+        self.assertIs(us, obj.user)
+
+    def test_user_missing(self):
+        """Test that user is None when user_id matches no User."""
+        self.assertIsNone(Place(user_id="unknown").user)
+
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -5,6 +5,7 @@ Unittest classes:
     TestReview_instantiation
     TestReview_save
     TestReview_to_dict
+    TestReview_user
 """
 import os
 import models
@@ -12,6 +13,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.review import Review
+from models.engine.file_storage import FileStorage
+from models.user import User
 
 
 class TestReview_instantiation(unittest.TestCase):
@@ -210,5 +213,26 @@ class TestReview_to_dict(unittest.TestCase):
             rv.to_dict(None)
 
 
+@unittest.skipIf(os.getenv("HBNB_TYPE_STORAGE") == "db",
+                 "The user relationship is mapped by SQLAlchemy")
+class TestReview_user(unittest.TestCase):
+    """Unittests for the user attribute of the Review class."""
+
+    def tearDown(self):
+        """Clean up the test environment."""
+        FileStorage._FileStorage__objects = {}
+
+    def test_user_is_the_author(self):
+        """Test that user returns the User of user_id."""
+        us = User()
+        models.storage.new(us)
+        obj = Review(user_id=us.id)
+        self.assertIs(us, obj.user)
+
+    def test_user_missing(self):
+        """Test that user is None when user_id matches no User."""
+        self.assertIsNone(Review(user_id="unknown").user)
+
+
 if __name__ == "__main__":
     unittest.main()
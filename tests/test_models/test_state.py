@@ -5,6 +5,7 @@ Unittest classes:
     TestState_instantiation
     TestState_save
     TestState_to_dict
+    TestState_from_dict
 """
 import os
 import models
@@ -196,5 +197,53 @@ class TestState_to_dict(unittest.TestCase):
             st.to_dict(None)
 
 
+class TestState_from_dict(unittest.TestCase):
+    """Unittests for testing the from_dict constructor of the State class."""
+
+    def test_round_trip(self):
+        st = State(name="California")
+        record = st.to_dict()
+        new = State.from_dict(record)
+        self.assertEqual(State, type(new))
+        self.assertEqual(st.__dict__, new.__dict__)
+        self.assertEqual(record, new.to_dict())
+
+    def test_matches_kwargs_constructor(self):
+        record = State(name="Texas").to_dict()
+        self.assertEqual(State(**record).__dict__,
+                         State.from_dict(record).__dict__)
+
+    def test_parses_time_fmt(self):
+        record = State().to_dict()
+        record["created_at"] = "2017-09-28T21:05:54.119427"
+        record["updated_at"] = "2017-9-28T21:05:54.1"
+        st = State.from_dict(record)
+        self.assertEqual(datetime(2017, 9, 28, 21, 5, 54, 119427),
+                         st.created_at)
+        self.assertEqual(datetime(2017, 9, 28, 21, 5, 54, 100000),
+                         st.updated_at)
+
+    def test_rejects_other_iso_formats(self):
+        for value in ("2017-09-28T21:05:54", "2017-09-28",
+                      "2017-09-28 21:05:54.119427",
+                      "2017-09-28T21:05:54.119427+00:00",
+                      "2017-09-28T21:05:54.1+0000",
+                      "2017-W39-4T21:05:54.119427"):
+            record = State().to_dict()
+            record["updated_at"] = value
+            with self.assertRaises(ValueError):
+                State.from_dict(record)
+
+    def test_not_stored(self):
+        st = State.from_dict(State().to_dict())
+        self.assertNotIn(st, models.storage.all().values())
+
+    def test_partial_record_gets_defaults(self):
+        st = State.from_dict({"name": "Ohio"})
+        self.assertEqual("Ohio", st.name)
+        self.assertEqual(str, type(st.id))
+        self.assertEqual(datetime, type(st.created_at))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -5,6 +5,7 @@ Unittest classes:
     TestUser_instantiation
     TestUser_save
     TestUser_to_dict
+    TestUser_from_dict
 """
 import os
 import models
@@ -191,5 +192,18 @@ class TestUser_to_dict(unittest.TestCase):
             us.to_dict(None)
 
 
+class TestUser_from_dict(unittest.TestCase):
+    """Unittests for testing the from_dict constructor of the User class."""
+
+    def test_password_goes_through_property(self):
+        us = User(email="a@b.c")
+        us.password = "secret"
+        new = User.from_dict(us.to_dict(save_to_disk=True))
+        self.assertEqual("secret", new.password)
+        self.assertNotIn("password", new.__dict__)
+        self.assertEqual(us.to_dict(save_to_disk=True),
+                         new.to_dict(save_to_disk=True))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -7,13 +7,14 @@ from flask import render_template
 app = Flask(__name__)
 
 
-@app.route("/hbnb_filters", strict_slashes=False)
-def hbnb_filters():
-    """Displays the main HBnB filters HTML page."""
-    states = storage.all("State")
-    amenities = storage.all("Amenity")
-    return render_template("10-hbnb_filters.html",
-                           states=states, amenities=amenities)
+@app.route("/hbnb", strict_slashes=False)
+def hbnb():
+    """Displays the main HBnB HTML page."""
+    states = storage.query("State", order_by="name", load="hbnb")
+    amenities = storage.query("Amenity", order_by="name")
+    places = storage.query("Place", order_by="name", load="hbnb")
+    return render_template("100-hbnb.html",
+                           states=states, amenities=amenities, places=places)
 
 
 @app.teardown_appcontext
@@ -11,7 +11,7 @@ app = Flask(__name__)
 @app.route("/states_list", strict_slashes=False)
 def display_states():
     """Render state_list html page to display States created"""
-    states = storage.all()
+    states = storage.query(State, order_by='name')
     return render_template('7-states_list.html', states=states)
 
 